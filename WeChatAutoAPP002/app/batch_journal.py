@@ -0,0 +1,187 @@
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+
+# 每位好友的发送状态
+STATE_PENDING = "pending"      # 尚未处理
+STATE_SEARCHING = "searching"  # 正在搜索并打开聊天（消息还没有发出，可以安全重试）
+STATE_SENDING = "sending"      # 已触发发送，结果未确认（中途崩溃时可能已经发出，不自动重发）
+STATE_SENT = "sent"            # 已发送
+STATE_FAILED = "failed"        # 发送失败（续发时重试）
+# 续发时跳过的状态
+DONE_STATES = (STATE_SENT, STATE_SENDING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    campaign TEXT PRIMARY KEY,
+    message TEXT NOT NULL,
+    source TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    idempotency_key TEXT PRIMARY KEY,
+    campaign TEXT NOT NULL,
+    friend TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_deliveries_campaign ON deliveries (campaign, position);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    detail TEXT,
+    at REAL NOT NULL
+);
+"""
+
+
+def new_campaign_id(now=None):
+    """每次新建批量发送生成唯一的批次编号（时间 + 随机后缀）"""
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+    return f"{stamp}-{uuid.uuid4().hex[:6]}"
+
+
+def make_idempotency_key(campaign, friend):
+    """(批次, 好友) 的幂等键"""
+    return hashlib.sha1(f"{campaign}\0{friend}".encode("utf-8")).hexdigest()
+
+
+class BatchJournal:
+    """批量发送日志：SQLite（WAL 模式）记录每位好友的发送状态和时间，进程崩溃后可以续发
+
+    每次批量发送是一个批次，批次编号和消息内容保存在 campaigns 表中，续发时明确指定要续发的批次。
+    状态变化同时追加到 events 表，便于事后核对。
+    """
+    def __init__(self, db_file, clock=time.time):
+        self.db_file = db_file
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # 标记“正在发送”必须在真正发送前落盘，否则崩溃后无法阻止重发
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+
+    def _append_event(self, key, state, detail, now):
+        self._conn.execute(
+            "INSERT INTO events (idempotency_key, state, detail, at) VALUES (?, ?, ?, ?)",
+            (key, state, detail, now)
+        )
+
+    def new_campaign(self, message, source=None):
+        """登记一个新批次，source 为好友名单来源（如好友文件路径），返回批次编号"""
+        now = self.clock()
+        campaign = new_campaign_id(now)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO campaigns (campaign, message, source, created_at) VALUES (?, ?, ?, ?)",
+                (campaign, message, source, now)
+            )
+        return campaign
+
+    def campaign_info(self, campaign):
+        """批次信息 dict（campaign, message, source, created_at, finished_at），不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT campaign, message, source, created_at, finished_at FROM campaigns WHERE campaign = ?",
+                (campaign,)
+            ).fetchone()
+        if not row:
+            return None
+        return dict(zip(("campaign", "message", "source", "created_at", "finished_at"), row))
+
+    def last_campaign(self):
+        """最近一次批量发送的批次信息，没有时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT campaign FROM campaigns ORDER BY created_at DESC, rowid DESC LIMIT 1"
+            ).fetchone()
+        return self.campaign_info(row[0]) if row else None
+
+    def finish(self, campaign):
+        """记录批次已经完整处理过一遍名单"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE campaigns SET finished_at = ? WHERE campaign = ?", (self.clock(), campaign)
+            )
+
+    def enqueue(self, campaign, friends, start=0):
+        """登记本批次的好友（已登记的保持原状态），start 为第一位好友在名单中的序号，返回新登记的数量"""
+        now = self.clock()
+        added = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for position, friend in enumerate(friends, start):
+                    key = make_idempotency_key(campaign, friend)
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO deliveries "
+                        "(idempotency_key, campaign, friend, position, state, created_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (key, campaign, friend, position, STATE_PENDING, now, now)
+                    )
+                    if cursor.rowcount:
+                        self._append_event(key, STATE_PENDING, None, now)
+                        added += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def mark(self, campaign, friend, state, error=None):
+        """更新好友的发送状态（开始搜索时累计尝试次数）"""
+        key = make_idempotency_key(campaign, friend)
+        now = self.clock()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "UPDATE deliveries SET state = ?, error = ?, updated_at = ?, "
+                    "attempts = attempts + ? WHERE idempotency_key = ?",
+                    (state, error, now, 1 if state == STATE_SEARCHING else 0, key)
+                )
+                self._append_event(key, state, error, now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def state(self, campaign, friend):
+        """好友的当前状态，未登记时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM deliveries WHERE idempotency_key = ?",
+                (make_idempotency_key(campaign, friend),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def friends_in_state(self, campaign, state):
+        """本批次处于指定状态的好友"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT friend FROM deliveries WHERE campaign = ? AND state = ? ORDER BY position",
+                (campaign, state)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def summary(self, campaign):
+        """本批次各状态的人数 {状态: 数量}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) FROM deliveries WHERE campaign = ? GROUP BY state",
+                (campaign,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
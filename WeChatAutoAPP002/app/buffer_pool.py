@@ -0,0 +1,76 @@
+import threading
+import numpy as np
+
+
+def read_only(array):
+    """返回数组的只读视图（不复制数据）"""
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class BufferPool:
+    """预分配 NumPy 缓冲区池：按形状复用截屏原图和灰度图缓冲区，总内存不超过 max_bytes
+
+    acquire 取出的缓冲区在 release 归还之前不会再分配给别人（帧在释放时归还它用到的缓冲区）。
+    """
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._buffers = []
+        self._in_use = set()  # 已取出的缓冲区的 id
+        self._lock = threading.Lock()
+        self.allocations = 0  # 新分配缓冲区的次数
+        self.overflows = 0    # 超出内存上限、临时分配不入池的次数
+
+    @property
+    def pooled_bytes(self):
+        """池中缓冲区占用的总字节数"""
+        with self._lock:
+            return sum(buf.nbytes for buf in self._buffers)
+
+    def _is_free(self, index):
+        return id(self._buffers[index]) not in self._in_use
+
+    def acquire(self, shape, dtype=np.uint8):
+        """取一个指定形状的空闲缓冲区并标记为已取出，没有时新分配（内容未初始化）"""
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        with self._lock:
+            for index in range(len(self._buffers)):
+                if (self._buffers[index].shape == shape and self._buffers[index].dtype == dtype
+                        and self._is_free(index)):
+                    self._in_use.add(id(self._buffers[index]))
+                    return self._buffers[index]
+
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            # 超出上限时先淘汰空闲的其它形状缓冲区（如分辨率变化后的旧尺寸）
+            total = sum(buf.nbytes for buf in self._buffers)
+            index = 0
+            while total + nbytes > self.max_bytes and index < len(self._buffers):
+                if self._is_free(index):
+                    total -= self._buffers[index].nbytes
+                    del self._buffers[index]
+                else:
+                    index += 1
+
+            buffer = np.empty(shape, dtype=dtype)
+            self.allocations += 1
+            if total + nbytes <= self.max_bytes:
+                self._buffers.append(buffer)
+                self._in_use.add(id(buffer))
+            else:
+                self.overflows += 1
+            return buffer
+
+    def release(self, buffers):
+        """归还缓冲区（不是从池中取出的数组直接忽略）"""
+        with self._lock:
+            for buffer in buffers:
+                if any(buffer is pooled for pooled in self._buffers):
+                    self._in_use.discard(id(buffer))
+
+    def clear(self):
+        """清空缓冲区池"""
+        with self._lock:
+            self._buffers = []
+            self._in_use = set()
@@ -0,0 +1,205 @@
+import os
+import sys
+import threading
+import cv2
+import numpy as np
+
+
+class CaptureBackend:
+    """截屏后端接口：capture 返回 (RGB 数组, (left, top))，坐标为屏幕坐标"""
+    def capture(self, region=None):
+        """截取 region=(left, top, width, height)，None 表示后端默认区域"""
+        raise NotImplementedError
+
+    def screen_size(self):
+        """屏幕尺寸 (宽, 高)"""
+        raise NotImplementedError
+
+    def capture_into(self, pool, region=None):
+        """供帧采集层使用：尽量把原始像素直接写入 pool 中的缓冲区，返回 (像素, (left, top), 像素格式)"""
+        pixels, origin = self.capture(region)
+        return pixels, origin, "RGB"
+
+
+class PyAutoGuiBackend(CaptureBackend):
+    """pyautogui 截屏（原有方式），默认截取全屏"""
+    def capture(self, region=None):
+        import pyautogui
+        screenshot = pyautogui.screenshot(region=region) if region else pyautogui.screenshot()
+        origin = (region[0], region[1]) if region else (0, 0)
+        # asarray 直接引用 PIL 导出的像素数据，省掉 np.array 的再次复制
+        return np.asarray(screenshot), origin
+
+    def capture_into(self, pool, region=None):
+        # PIL 导出像素时总会生成一份临时数组；复制进池中的缓冲区后临时数组随即释放，帧持有的原图受内存上限约束
+        rgb, origin = self.capture(region)
+        buffer = pool.acquire(rgb.shape, rgb.dtype)
+        np.copyto(buffer, rgb)
+        return buffer, origin, "RGB"
+
+    def screen_size(self):
+        import pyautogui
+        width, height = pyautogui.size()
+        return width, height
+
+
+class GdiWindowBackend(CaptureBackend):
+    """Windows GDI 截屏：BitBlt 后直接读取原始像素缓冲区，默认只截取微信窗口区域"""
+    SRCCOPY = 0x00CC0020
+    CAPTUREBLT = 0x40000000
+    DIB_RGB_COLORS = 0
+
+    def __init__(self, region_provider=None):
+        if sys.platform != "win32":
+            raise RuntimeError("GDI 截屏只支持 Windows")
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        self.region_provider = region_provider
+        self._user32 = ctypes.windll.user32
+        self._gdi32 = ctypes.windll.gdi32
+        self._lock = threading.Lock()
+
+        # 显式声明参数类型，避免 64 位句柄被截断
+        self._user32.GetDC.argtypes = [wintypes.HWND]
+        self._user32.GetDC.restype = wintypes.HDC
+        self._user32.ReleaseDC.argtypes = [wintypes.HWND, wintypes.HDC]
+        self._gdi32.CreateCompatibleDC.argtypes = [wintypes.HDC]
+        self._gdi32.CreateCompatibleDC.restype = wintypes.HDC
+        self._gdi32.CreateCompatibleBitmap.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int]
+        self._gdi32.CreateCompatibleBitmap.restype = wintypes.HBITMAP
+        self._gdi32.SelectObject.argtypes = [wintypes.HDC, wintypes.HGDIOBJ]
+        self._gdi32.SelectObject.restype = wintypes.HGDIOBJ
+        self._gdi32.BitBlt.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                       wintypes.HDC, ctypes.c_int, ctypes.c_int, wintypes.DWORD]
+        self._gdi32.GetDIBits.argtypes = [wintypes.HDC, wintypes.HBITMAP, wintypes.UINT, wintypes.UINT,
+                                          ctypes.c_void_p, ctypes.c_void_p, wintypes.UINT]
+        self._gdi32.DeleteObject.argtypes = [wintypes.HGDIOBJ]
+        self._gdi32.DeleteDC.argtypes = [wintypes.HDC]
+
+        class BITMAPINFOHEADER(ctypes.Structure):
+            _fields_ = [
+                ('biSize', wintypes.DWORD), ('biWidth', wintypes.LONG), ('biHeight', wintypes.LONG),
+                ('biPlanes', wintypes.WORD), ('biBitCount', wintypes.WORD), ('biCompression', wintypes.DWORD),
+                ('biSizeImage', wintypes.DWORD), ('biXPelsPerMeter', wintypes.LONG),
+                ('biYPelsPerMeter', wintypes.LONG), ('biClrUsed', wintypes.DWORD),
+                ('biClrImportant', wintypes.DWORD),
+            ]
+        self._header_type = BITMAPINFOHEADER
+
+    def screen_size(self):
+        return self._user32.GetSystemMetrics(0), self._user32.GetSystemMetrics(1)
+
+    def _grab_bgra(self, left, top, width, height, buffer=None):
+        """BitBlt 截取区域，像素直接写入 buffer（形状为 (高, 宽, 4) 的 uint8 数组），返回 BGRA 数组"""
+        ctypes = self._ctypes
+        if buffer is None:
+            buffer = np.empty((height, width, 4), dtype=np.uint8)
+        header = self._header_type()
+        header.biSize = ctypes.sizeof(self._header_type)
+        header.biWidth = width
+        header.biHeight = -height  # 负数表示自上而下的行顺序
+        header.biPlanes = 1
+        header.biBitCount = 32
+
+        with self._lock:
+            screen_dc = self._user32.GetDC(None)
+            memory_dc = self._gdi32.CreateCompatibleDC(screen_dc)
+            bitmap = self._gdi32.CreateCompatibleBitmap(screen_dc, width, height)
+            old_bitmap = self._gdi32.SelectObject(memory_dc, bitmap)
+            try:
+                self._gdi32.BitBlt(memory_dc, 0, 0, width, height, screen_dc, left, top,
+                                   self.SRCCOPY | self.CAPTUREBLT)
+                self._gdi32.GetDIBits(memory_dc, bitmap, 0, height, buffer.ctypes.data,
+                                      ctypes.byref(header), self.DIB_RGB_COLORS)
+            finally:
+                self._gdi32.SelectObject(memory_dc, old_bitmap)
+                self._gdi32.DeleteObject(bitmap)
+                self._gdi32.DeleteDC(memory_dc)
+                self._user32.ReleaseDC(None, screen_dc)
+        return buffer
+
+    def _resolve_region(self, region):
+        if region is None and self.region_provider:
+            region = self.region_provider()
+        if region is None:
+            width, height = self.screen_size()
+            region = (0, 0, width, height)
+        return [int(v) for v in region]
+
+    def capture(self, region=None):
+        left, top, width, height = self._resolve_region(region)
+        bgra = self._grab_bgra(left, top, width, height)
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2RGB), (left, top)
+
+    def capture_into(self, pool, region=None):
+        left, top, width, height = self._resolve_region(region)
+        bgra = self._grab_bgra(left, top, width, height, pool.acquire((height, width, 4)))
+        return bgra, (left, top), "BGRA"
+
+
+class FrameSequenceBackend(CaptureBackend):
+    """确定性截屏后端：依次回放 PNG 文件或内存中的 RGB 帧，用于测试和基准测试"""
+    def __init__(self, frames=None, loop=True):
+        self.frames = []
+        self.loop = loop
+        self.index = 0
+        self._lock = threading.Lock()
+        for frame in frames or []:
+            self.add(frame)
+
+    def add(self, frame):
+        """添加一帧：PNG 文件路径或 RGB 数组"""
+        if isinstance(frame, str):
+            bgr = cv2.imread(frame, cv2.IMREAD_COLOR)
+            if bgr is None:
+                raise FileNotFoundError(frame)
+            frame = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+        self.frames.append(frame)
+
+    def show(self, frame):
+        """替换为只含这一帧的序列"""
+        with self._lock:
+            self.frames = []
+            self.index = 0
+        self.add(frame)
+
+    def _current(self):
+        if not self.frames:
+            raise RuntimeError("没有可回放的帧")
+        return self.frames[min(self.index, len(self.frames) - 1)]
+
+    def _next(self):
+        with self._lock:
+            frame = self._current()
+            if self.index < len(self.frames) - 1:
+                self.index += 1
+            elif self.loop:
+                self.index = 0
+            return frame
+
+    def screen_size(self):
+        with self._lock:
+            frame = self._current()
+        return frame.shape[1], frame.shape[0]
+
+    def capture(self, region=None):
+        frame = self._next()
+        if region is None:
+            return frame, (0, 0)
+        left, top, width, height = region
+        left, top = max(0, left), max(0, top)
+        return frame[top:top + height, left:left + width], (left, top)
+
+
+def create_capture_backend(name="pyautogui", region_provider=None, files=None):
+    """按名称创建截屏后端：pyautogui / window（GDI 窗口截屏）/ file（文件回放）"""
+    if name == "window":
+        try:
+            return GdiWindowBackend(region_provider)
+        except Exception as e:
+            print(f"窗口截屏后端不可用，改用 pyautogui: {e}")
+            return PyAutoGuiBackend()
+    if name == "file":
+        return FrameSequenceBackend([f for f in files or [] if os.path.exists(f)])
+    return PyAutoGuiBackend()
@@ -0,0 +1,106 @@
+import os
+import json
+import threading
+
+
+class ElementPositionMemo:
+    """元素位置备忘：按 (元素, 主题, 窗口几何) 记录上次定位结果，并在会话间持久化"""
+    def __init__(self, memo_file=None):
+        self.memo_file = memo_file
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def make_key(element, theme, window):
+        """生成备忘键，窗口移动或缩放后键随之变化"""
+        return (f"{element}|{theme}|{window['left']},{window['top']},"
+                f"{window['width']},{window['height']}")
+
+    def lookup(self, element, theme, window):
+        """查询记住的位置，返回 dict 或 None"""
+        if not window:
+            return None
+        with self._lock:
+            entry = self._entries.get(self.make_key(element, theme, window))
+            return dict(entry) if entry else None
+
+    def remember(self, element, theme, window, match, scale):
+        """记录一次成功的定位结果"""
+        if not window:
+            return
+        entry = {
+            'left': int(match.left),
+            'top': int(match.top),
+            'width': int(match.width),
+            'height': int(match.height),
+            'scale': scale,
+        }
+        key = self.make_key(element, theme, window)
+        with self._lock:
+            if self._entries.get(key) == entry:
+                return
+            # 同一元素和主题只保留当前窗口几何下的记录
+            prefix = f"{element}|{theme}|"
+            for old_key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[old_key]
+            self._entries[key] = entry
+        self.save()
+
+    def relocate(self, old_window, new_window):
+        """窗口只移动、大小不变时，把旧位置下的记录平移到新位置，返回平移的记录数"""
+        if (not old_window or not new_window or
+                (old_window['width'], old_window['height']) != (new_window['width'], new_window['height'])):
+            return 0
+        dx = new_window['left'] - old_window['left']
+        dy = new_window['top'] - old_window['top']
+        old_suffix = self.make_key("", "", old_window).split("|", 2)[2]
+        moved = 0
+        with self._lock:
+            for key in [k for k in self._entries if k.endswith("|" + old_suffix)]:
+                element, theme, _ = key.split("|", 2)
+                entry = dict(self._entries.pop(key))
+                entry['left'] += dx
+                entry['top'] += dy
+                self._entries[self.make_key(element, theme, new_window)] = entry
+                moved += 1
+        if moved:
+            self.save()
+        return moved
+
+    def forget(self, element, theme, window):
+        """校验失败时删除记录"""
+        if not window:
+            return
+        with self._lock:
+            removed = self._entries.pop(self.make_key(element, theme, window), None)
+        if removed is not None:
+            self.save()
+
+    def load(self):
+        """从文件加载备忘记录"""
+        if not self.memo_file or not os.path.exists(self.memo_file):
+            return
+        try:
+            with open(self.memo_file, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            with self._lock:
+                self._entries = entries if isinstance(entries, dict) else {}
+        except Exception as e:
+            print(f"元素位置备忘加载失败: {e}")
+
+    def save(self):
+        """保存备忘记录到文件（先写临时文件再替换）"""
+        if not self.memo_file:
+            return False
+        try:
+            with self._lock:
+                data = dict(self._entries)
+            tmp_file = self.memo_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_file, self.memo_file)
+            return True
+        except Exception as e:
+            print(f"元素位置备忘保存失败: {e}")
+            return False
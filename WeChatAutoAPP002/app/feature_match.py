@@ -0,0 +1,67 @@
+import heapq
+import threading
+import cv2
+import numpy as np
+
+# Lowe 比率测试阈值
+RATIO_TEST = 0.75
+# 至少需要的有效匹配数
+MIN_MATCH_COUNT = 10
+# 参与平均距离判断的最优匹配数
+TOP_K_MATCHES = 10
+# 最优匹配的平均汉明距离上限
+MAX_AVG_DISTANCE = 50
+
+# ORB 检测器不保证线程安全，每个线程各用一个
+_local = threading.local()
+
+
+def get_orb():
+    """获取当前线程的 ORB 检测器"""
+    orb = getattr(_local, "orb", None)
+    if orb is None:
+        orb = cv2.ORB_create()
+        _local.orb = orb
+    return orb
+
+
+def compute_features(gray):
+    """计算灰度图的 ORB 关键点和描述子，返回 (keypoints, descriptors)"""
+    return get_orb().detectAndCompute(gray, None)
+
+
+def _knn_match(des_template, des_screen):
+    """暴力 KNN(k=2) 匹配（ORB 默认最多 500 个特征，暴力匹配已经足够快）"""
+    return cv2.BFMatcher(cv2.NORM_HAMMING).knnMatch(des_template, des_screen, k=2)
+
+
+def match_features(template_features, screen_features, template_shape):
+    """用比率测试筛选匹配并求单应性，返回模板在屏幕图中的外接矩形 (x, y, w, h) 或 None"""
+    kp_t, des_t = template_features
+    kp_s, des_s = screen_features
+    if des_t is None or des_s is None or len(des_t) < 2 or len(des_s) < 2:
+        return None
+
+    good = []
+    for pair in _knn_match(des_t, des_s):
+        # 描述子很少时可能返回不足两个近邻
+        if len(pair) == 2 and pair[0].distance < RATIO_TEST * pair[1].distance:
+            good.append(pair[0])
+    if len(good) < MIN_MATCH_COUNT:
+        return None
+
+    # 只需要最优的若干个匹配，不必整体排序
+    best = heapq.nsmallest(TOP_K_MATCHES, good, key=lambda m: m.distance)
+    avg_distance = sum(m.distance for m in best) / len(best)
+    if avg_distance >= MAX_AVG_DISTANCE:
+        return None
+
+    src_pts = np.float32([kp_t[m.queryIdx].pt for m in good])
+    dst_pts = np.float32([kp_s[m.trainIdx].pt for m in good])
+    M, _ = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, 5.0)
+    if M is None:
+        return None
+
+    h, w = template_shape[:2]
+    pts = np.float32([[0, 0], [0, h - 1], [w - 1, h - 1], [w - 1, 0]]).reshape(-1, 1, 2)
+    return cv2.boundingRect(cv2.perspectiveTransform(pts, M))
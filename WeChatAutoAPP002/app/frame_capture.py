@@ -0,0 +1,112 @@
+import time
+import weakref
+import threading
+import cv2
+import numpy as np
+from app.capture_backends import PyAutoGuiBackend
+from app.buffer_pool import BufferPool, read_only
+
+# 原始像素格式 -> 灰度 / RGB 转换码
+_GRAY_CODES = {"RGB": cv2.COLOR_RGB2GRAY, "RGBA": cv2.COLOR_RGBA2GRAY, "BGRA": cv2.COLOR_BGRA2GRAY}
+_RGB_CODES = {"RGBA": cv2.COLOR_RGBA2RGB, "BGRA": cv2.COLOR_BGRA2RGB}
+
+
+class Frame:
+    """一帧屏幕截图：原始像素 + 只转换一次的灰度图，origin 为帧左上角的屏幕坐标
+
+    对外只提供只读视图；提供 pool 时灰度图直接转换到池中的缓冲区。
+    帧被释放时把原图和转换结果的缓冲区归还给 pool，帧的数组视图不应在帧释放后继续使用。
+    """
+    def __init__(self, pixels, timestamp, origin=(0, 0), pixel_format="RGB", pool=None):
+        self.pixels = read_only(pixels)
+        self._pooled = [pixels]  # 本帧从池中取得的缓冲区（不是池中的数组归还时会被忽略）
+        if pool is not None:
+            weakref.finalize(self, pool.release, self._pooled)
+        self.pixel_format = pixel_format
+        self.timestamp = timestamp
+        self.origin = origin
+        self.pool = pool
+        self._gray = None
+        self._rgb = self.pixels if pixel_format == "RGB" else None
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _convert(self, code, shape):
+        dst = None
+        if self.pool:
+            dst = self.pool.acquire(shape, np.uint8)
+            self._pooled.append(dst)
+        return read_only(cv2.cvtColor(self.pixels, code, dst=dst))
+
+    @property
+    def gray(self):
+        """灰度图，首次访问时转换并缓存"""
+        if self._gray is None:
+            with self._lock:
+                if self._gray is None:
+                    self._gray = self._convert(_GRAY_CODES[self.pixel_format], self.pixels.shape[:2])
+        return self._gray
+
+    @property
+    def rgb(self):
+        """RGB 图，原始格式不是 RGB 时首次访问才转换"""
+        if self._rgb is None:
+            with self._lock:
+                if self._rgb is None:
+                    self._rgb = self._convert(_RGB_CODES[self.pixel_format], self.pixels.shape[:2] + (3,))
+        return self._rgb
+
+    def cached(self, key, factory):
+        """按 key 缓存基于本帧计算的结果（如某区域的特征点），每帧只算一次"""
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+        value = factory()
+        with self._lock:
+            return self._cache.setdefault(key, value)
+
+    @property
+    def size(self):
+        """帧尺寸 (宽, 高)"""
+        return self.pixels.shape[1], self.pixels.shape[0]
+
+    @property
+    def bounds(self):
+        """帧覆盖的屏幕范围 (left, top, width, height)"""
+        return (self.origin[0], self.origin[1]) + self.size
+
+    def age(self):
+        """帧距今的秒数"""
+        return time.monotonic() - self.timestamp
+
+
+class FrameGrabber:
+    """帧采集层：TTL 内复用同一帧，所有匹配器共享；截屏方式由可替换的后端决定
+
+    原图和灰度图使用预分配缓冲区池，内存占用不超过 max_buffer_bytes。
+    """
+    def __init__(self, ttl=0.2, backend=None, max_buffer_bytes=256 * 1024 * 1024):
+        self.ttl = ttl
+        self.backend = backend or PyAutoGuiBackend()
+        self.pool = BufferPool(max_buffer_bytes)
+        self._frame = None
+        self._lock = threading.Lock()
+        self.capture_count = 0  # 实际截屏次数，便于统计
+
+    def grab(self, force=False):
+        """获取当前帧，TTL 内直接复用上一帧"""
+        with self._lock:
+            frame = self._frame
+            if force or frame is None or frame.age() > self.ttl:
+                # 先释放旧帧，没有匹配器再持有它时其缓冲区归还给池，可以直接复用
+                self._frame = frame = None
+                pixels, origin, pixel_format = self.backend.capture_into(self.pool)
+                frame = Frame(pixels, time.monotonic(), origin, pixel_format, self.pool)
+                self._frame = frame
+                self.capture_count += 1
+            return frame
+
+    def invalidate(self):
+        """界面发生变化（点击、输入）后丢弃缓存帧"""
+        with self._lock:
+            self._frame = None
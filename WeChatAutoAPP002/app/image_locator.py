@@ -0,0 +1,310 @@
+import os
+from app.search_regions import SearchRegionPlanner, clamp_region
+from app.element_memo import ElementPositionMemo
+from app.pyramid_match import pyramid_match, exhaustive_match
+from app.feature_match import compute_features, match_features
+from app.parallel_locate import create_locate_executor, best_of_jobs
+from app.theme_detector import ThemeDetector
+from app.scale_calibrator import ScaleCalibrator
+
+THEMES = ("light", "dark")
+
+
+class ImageLocator:
+    """图像识别定位流程：位置备忘校验 -> 元素预期区域 -> 微信窗口 -> 全屏，只搜索当前主题的模板
+
+    只依赖截屏帧和模板，不依赖 pyautogui 和界面库：程序使用实时截屏，基准测试用回放截屏后端驱动同一流程。
+    window_provider() 返回微信窗口的 {'left', 'top', 'width', 'height'}，未知时返回 None。
+    """
+    def __init__(self, template_path, template_store, frame_grabber, window_provider=lambda: None,
+                 position_memo=None, locate_workers=4, use_pyramid=True, early_stop_confidence=0.95,
+                 on_status=print):
+        self.template_path = template_path
+        self.template_store = template_store
+        self.frame_grabber = frame_grabber
+        self.window_provider = window_provider
+        self.use_pyramid = use_pyramid
+        self.early_stop_confidence = early_stop_confidence
+        self.on_status = on_status
+        # 搜索区域规划：优先元素预期区域和微信窗口，全屏最后尝试
+        self.search_planner = SearchRegionPlanner()
+        # 元素位置备忘：窗口不动时只需校验上次位置附近的小块区域
+        self.position_memo = position_memo or ElementPositionMemo()
+        # 并行定位线程池（locate_workers 不大于 1 时为串行模式）
+        self.locate_executor = create_locate_executor(locate_workers)
+        # 主题检测：只搜索当前主题的模板
+        self.theme_detector = ThemeDetector()
+        # 尺度校准：显示缩放在一次会话内基本不变，校准后只尝试相邻尺度
+        self.scale_calibrator = ScaleCalibrator()
+
+    @property
+    def window(self):
+        return self.window_provider()
+
+    def window_region(self):
+        """微信窗口的 (left, top, width, height)，窗口信息未知时返回 None"""
+        win = self.window
+        if not win:
+            return None
+        return (win['left'], win['top'], win['width'], win['height'])
+
+    def locate(self, template_name, confidence, frame):
+        """在给定帧中定位单个元素，找不到时返回 None"""
+        template_files = [
+            os.path.join(self.template_path, mode, f"{template_name}.png")
+            for mode in THEMES
+        ]
+
+        valid_templates = [f for f in template_files if os.path.exists(f)]
+        if not valid_templates:
+            self.on_status(f"模板文件不存在: {template_files}")
+            return None
+
+        # 只搜索当前主题的模板；连续失败时重新检测主题
+        theme = self.detect_theme(frame)
+        themed_templates = self.templates_for_theme(valid_templates, theme)
+        result = self._locate_with_templates(template_name, themed_templates, confidence, frame)
+        if self.theme_detector.report(result is not None):
+            new_theme = self.detect_theme(frame)
+            if new_theme != theme:
+                self.on_status(f"检测到主题变化: {theme} -> {new_theme}")
+                themed_templates = self.templates_for_theme(valid_templates, new_theme)
+                result = self._locate_with_templates(template_name, themed_templates, confidence, frame)
+                self.theme_detector.report(result is not None)
+        return result
+
+    def detect_theme(self, frame=None):
+        """检测微信当前主题（light/dark），会话内缓存结果"""
+        def window_gray():
+            current = frame or self.frame_grabber.grab()
+            return self.frame_region(current, self.window_region())[0]
+
+        try:
+            return self.theme_detector.current(window_gray)
+        except Exception as e:
+            self.on_status(f"主题检测失败: {e}")
+            return None
+
+    def templates_for_theme(self, template_files, theme):
+        """筛选指定主题的模板，没有对应模板或主题未知时返回全部"""
+        themed = [f for f in template_files if self.template_theme(f) == theme]
+        return themed or template_files
+
+    @staticmethod
+    def template_theme(template_file):
+        """根据模板所在子目录返回主题（light/dark）"""
+        return os.path.basename(os.path.dirname(template_file))
+
+    def _locate_with_templates(self, template_name, valid_templates, confidence, frame):
+        """用给定模板在一帧内定位：位置备忘校验 -> 区域搜索"""
+        # 先校验上次记住的位置，命中则跳过全局搜索
+        result = self._verify_remembered_position(template_name, valid_templates, confidence, frame)
+        if result:
+            return result
+
+        # 已校准时先只用校准尺度搜索，找不到再尝试全部尺度和特征匹配
+        environment = self.scale_calibrator.make_environment(frame.size, self.window)
+        scales = self.scale_calibrator.candidate_scales(environment, template_name)
+        if scales is not None:
+            result = self._search_regions(template_name, valid_templates, confidence, frame,
+                                          scales=scales, use_features=False)
+            if result:
+                return result
+        return self._search_regions(template_name, valid_templates, confidence, frame)
+
+    def _search_regions(self, template_name, valid_templates, confidence, frame, scales=None, use_features=True):
+        """由小到大依次搜索：元素预期区域 -> 微信窗口 -> 全屏"""
+        regions = self.search_planner.regions(template_name, self.window, frame.bounds)
+
+        for region_name, region in regions:
+            if self.locate_executor is not None:
+                # 并行模式：所有模板和尺度一起分发到线程池
+                template_file, result = self.parallel_template_match(valid_templates, confidence, frame, region, scales)
+                if result:
+                    self._on_template_matched(template_name, template_file, region_name, result, frame)
+                    return result
+
+            for template_file in valid_templates:
+                if self.locate_executor is None:
+                    # 尝试多尺度匹配
+                    result = self.multi_scale_template_match(template_file, confidence, frame=frame,
+                                                             region=region, scales=scales)
+                    if result:
+                        self._on_template_matched(template_name, template_file, region_name, result, frame)
+                        return result
+
+                if not use_features:
+                    continue
+
+                # 尝试特征匹配
+                result = self.feature_based_match(template_file, frame=frame, region=region)
+                if result:
+                    mode_used = "深色" if "dark" in template_file else "浅色"
+                    self.on_status(f"✓ 特征匹配成功定位 {template_name}（{mode_used}模式，区域: {region_name}）")
+                    self._learn_element_zone(template_name, region_name, result)
+                    return result
+
+        return None
+
+    def _on_template_matched(self, template_name, template_file, region_name, result, frame):
+        """多尺度匹配成功后：输出日志、更新预期区域、位置备忘和尺度校准"""
+        mode_used = "深色" if "dark" in template_file else "浅色"
+        self.on_status(f"✓ 多尺度匹配成功定位 {template_name}（{mode_used}模式，区域: {region_name}）")
+        self._learn_element_zone(template_name, region_name, result)
+        window = self.window
+        self.position_memo.remember(template_name, self.template_theme(template_file),
+                                    window, result, result.scale)
+        environment = self.scale_calibrator.make_environment(frame.size, window)
+        if self.scale_calibrator.record(environment, template_name, result.scale):
+            self.on_status(f"尺度校准完成: {template_name} {result.scale}")
+
+    def _verify_remembered_position(self, template_name, valid_templates, confidence, frame):
+        """只在记住的位置附近用记住的尺度校验一次，失败则清除该记录"""
+        window = self.window
+        if not window:
+            return None
+
+        margin = 8  # 校验区域四周的余量（像素）
+        for template_file in valid_templates:
+            theme = self.template_theme(template_file)
+            entry = self.position_memo.lookup(template_name, theme, window)
+            if not entry:
+                continue
+
+            region = (entry['left'] - margin, entry['top'] - margin,
+                      entry['width'] + margin * 2, entry['height'] + margin * 2)
+            result = self.multi_scale_template_match(template_file, confidence, frame=frame,
+                                                     region=region, scales=[entry['scale']])
+            if result:
+                self.on_status(f"✓ 位置备忘校验成功 {template_name}（{theme}）")
+                return result
+            self.position_memo.forget(template_name, theme, window)
+        return None
+
+    def _learn_element_zone(self, template_name, region_name, result):
+        """在窗口内定位成功时，记录元素的预期区域"""
+        window = self.window
+        if region_name != "screen" and window:
+            self.search_planner.learn(template_name, window, result)
+
+    def frame_region(self, frame, region):
+        """从帧中截取搜索区域的灰度图，返回 (灰度图, 左偏移, 上偏移)，偏移为屏幕坐标"""
+        origin_x, origin_y = frame.origin
+        if region is None:
+            return frame.gray, origin_x, origin_y
+        region = clamp_region(region, frame.bounds)
+        if region is None:
+            return None, 0, 0
+        left, top, width, height = region
+        x, y = left - origin_x, top - origin_y
+        return frame.gray[y:y + height, x:x + width], left, top
+
+    def multi_scale_template_match(self, template_path, confidence=0.7, frame=None, region=None, scales=None):
+        """多尺度模板匹配，region 为 (left, top, width, height) 时只在该区域内搜索，scales 限定尝试的尺度"""
+        try:
+            frame = frame or self.frame_grabber.grab()
+            screen_gray, offset_x, offset_y = self.frame_region(frame, region)
+            if screen_gray is None:
+                return None
+
+            entry = self.template_store.get(template_path)
+            if entry is None or not entry.scaled:
+                return None
+
+            best_match = None
+
+            for scale, resized_template in entry.scaled:
+                if scales is not None and scale not in scales:
+                    continue
+                match = self._match_scale(screen_gray, entry, scale, resized_template, confidence, offset_x, offset_y)
+                if match and (best_match is None or match.confidence > best_match.confidence):
+                    best_match = match
+
+            return best_match
+        except Exception as e:
+            self.on_status(f"多尺度匹配失败: {e}")
+            return None
+
+    def _match_scale(self, screen_gray, entry, scale, resized_template, confidence, offset_x=0, offset_y=0):
+        """单一尺度的模板匹配，置信度超过阈值时返回原元素位置的匹配对象"""
+        new_h, new_w = resized_template.shape[:2]
+        if new_w > screen_gray.shape[1] or new_h > screen_gray.shape[0]:
+            return None
+
+        # 由粗到细匹配：先降采样找候选，再全分辨率精确定位
+        if self.use_pyramid:
+            max_val, max_loc = pyramid_match(screen_gray, resized_template)
+        else:
+            max_val, max_loc = exhaustive_match(screen_gray, resized_template)
+
+        if max_val <= confidence:
+            return None
+        # 紧凑模板匹配到的是裁剪位置，换算回原元素的位置和大小
+        x, y, w, h = entry.element_rect(max_loc[0] + offset_x, max_loc[1] + offset_y, scale)
+        return type('Obj', (), {
+            'left': x, 'top': y, 'width': w, 'height': h,
+            'confidence': max_val, 'scale': scale
+        })()
+
+    def parallel_template_match(self, template_files, confidence, frame, region=None, scales=None):
+        """并行多尺度匹配：(模板, 主题, 尺度) 任务分发到线程池，返回 (模板文件, 匹配结果)"""
+        try:
+            screen_gray, offset_x, offset_y = self.frame_region(frame, region)
+            if screen_gray is None:
+                return None, None
+
+            entries = [(f, self.template_store.get(f)) for f in template_files]
+            jobs = [
+                (template_file, entry, scale, resized_template)
+                for template_file, entry in entries if entry is not None
+                for scale, resized_template in entry.scaled
+                if scales is None or scale in scales
+            ]
+            early_stop = self.early_stop_confidence
+
+            def evaluate(job):
+                template_file, entry, scale, resized_template = job
+                return self._match_scale(screen_gray, entry, scale, resized_template, confidence, offset_x, offset_y)
+
+            # 任一任务达到高置信度即取消其后的任务，结果与线程调度无关
+            index, result = best_of_jobs(
+                self.locate_executor, jobs, evaluate,
+                score=lambda match: match.confidence,
+                decisive=lambda match: match.confidence >= early_stop
+            )
+            if result is None:
+                return None, None
+            return jobs[index][0], result
+        except Exception as e:
+            self.on_status(f"并行匹配失败: {e}")
+            return None, None
+
+    def feature_based_match(self, template_path, frame=None, region=None):
+        """基于特征的图像匹配，region 为 (left, top, width, height) 时只在该区域内搜索"""
+        try:
+            frame = frame or self.frame_grabber.grab()
+            screen_gray, offset_x, offset_y = self.frame_region(frame, region)
+            if screen_gray is None:
+                return None
+
+            template = self.template_store.gray(template_path)
+            if template is None:
+                return None
+
+            # 模板特征只算一次；屏幕特征每帧每个区域只算一次
+            template_features = self.template_store.features(template_path)
+            screen_features = frame.cached(
+                ("orb", offset_x, offset_y, screen_gray.shape),
+                lambda: compute_features(screen_gray)
+            )
+
+            # KNN + 比率测试匹配，求单应性得到外接矩形
+            rect = match_features(template_features, screen_features, template.shape)
+            if rect is None:
+                return None
+
+            x, y, w, h = rect
+            return type('Obj', (), {'left': x + offset_x, 'top': y + offset_y, 'width': w, 'height': h})()
+        except Exception as e:
+            self.on_status(f"特征匹配失败: {e}")
+            return None
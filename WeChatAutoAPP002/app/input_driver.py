@@ -0,0 +1,126 @@
+import time
+import threading
+
+# 速度档位：鼠标移动耗时（0 表示直接瞬移点击）和每类操作后的等待时间（秒）
+# safe 档的等待时间为 None，表示沿用配置中的 pyautogui_pause（原有行为）
+SPEED_PROFILES = {
+    "safe": {"move_duration": 0.3, "delays": {"click": None, "key": None, "hotkey": None, "paste": None}},
+    "normal": {"move_duration": 0.1, "delays": {"click": 0.15, "key": 0.05, "hotkey": 0.1, "paste": 0.15}},
+    "fast": {"move_duration": 0.0, "delays": {"click": 0.03, "key": 0.01, "hotkey": 0.03, "paste": 0.05}},
+}
+DEFAULT_PROFILE = "safe"
+
+
+def make_profile(name, legacy_pause=0.5):
+    """按名称生成速度档位，未知名称使用默认档位"""
+    profile = SPEED_PROFILES.get(name, SPEED_PROFILES[DEFAULT_PROFILE])
+    delays = {action: legacy_pause if delay is None else delay for action, delay in profile["delays"].items()}
+    return {"move_duration": profile["move_duration"], "delays": delays}
+
+
+class PyAutoGuiDriver:
+    """真实输入驱动：pyautogui 鼠标键盘 + pyperclip 剪贴板，关闭 pyautogui 的全局暂停"""
+    def __init__(self):
+        import pyautogui
+        import pyperclip
+        self._pyautogui = pyautogui
+        self._pyperclip = pyperclip
+        pyautogui.PAUSE = 0  # 操作后的等待由速度档位按操作类型控制
+        pyautogui.FAILSAFE = True  # 启用安全模式
+
+    def click(self, x, y, move_duration=0.0):
+        if move_duration > 0:
+            self._pyautogui.moveTo(x, y, duration=move_duration)
+            self._pyautogui.click()
+        else:
+            self._pyautogui.click(x, y)
+
+    def press(self, key):
+        self._pyautogui.press(key)
+
+    def hotkey(self, *keys):
+        self._pyautogui.hotkey(*keys)
+
+    def paste(self, text):
+        self._pyperclip.copy(text)
+        self._pyautogui.hotkey('ctrl', 'v')
+
+
+class SendTiming:
+    """一次发送的耗时分解：输入操作（含操作后等待）、界面等待、其它（主要是识别定位）"""
+    def __init__(self, clock):
+        self.clock = clock
+        self.start = clock()
+        self.input_time = 0.0
+        self.wait_time = 0.0
+        self.actions = 0
+
+    def summary(self):
+        total = self.clock() - self.start
+        return {
+            'total': total,
+            'input': self.input_time,
+            'wait': self.wait_time,
+            'other': max(0.0, total - self.input_time - self.wait_time),
+            'actions': self.actions,
+        }
+
+
+class InputController:
+    """输入层：按速度档位执行点击和按键，并统计每次发送的输入耗时和等待耗时"""
+    def __init__(self, driver=None, profile=None, sleep=time.sleep, clock=time.perf_counter):
+        self._driver = driver
+        self.profile = profile or make_profile(DEFAULT_PROFILE)
+        self.sleep = sleep
+        self.clock = clock
+        self.timing = None
+        self._lock = threading.Lock()
+
+    @property
+    def driver(self):
+        """驱动在首次使用时创建（pyautogui 需要图形环境）"""
+        if self._driver is None:
+            self._driver = PyAutoGuiDriver()
+        return self._driver
+
+    def _run(self, kind, action):
+        start = self.clock()
+        action()
+        delay = self.profile["delays"].get(kind, 0)
+        if delay:
+            self.sleep(delay)
+        with self._lock:
+            if self.timing is not None:
+                self.timing.input_time += self.clock() - start
+                self.timing.actions += 1
+
+    def click(self, x, y):
+        """点击屏幕坐标（fast 档直接瞬移点击）"""
+        self._run("click", lambda: self.driver.click(x, y, self.profile["move_duration"]))
+
+    def press(self, key):
+        self._run("key", lambda: self.driver.press(key))
+
+    def hotkey(self, *keys):
+        self._run("hotkey", lambda: self.driver.hotkey(*keys))
+
+    def paste(self, text):
+        """通过剪贴板粘贴文本"""
+        self._run("paste", lambda: self.driver.paste(text))
+
+    def record_wait(self, elapsed):
+        """记录一段界面等待耗时"""
+        with self._lock:
+            if self.timing is not None:
+                self.timing.wait_time += elapsed
+
+    def begin_timing(self):
+        """开始统计一次发送的耗时"""
+        with self._lock:
+            self.timing = SendTiming(self.clock)
+
+    def end_timing(self):
+        """结束统计，返回耗时分解 dict；未开始统计时返回 None"""
+        with self._lock:
+            timing, self.timing = self.timing, None
+        return timing.summary() if timing else None
@@ -0,0 +1,524 @@
+"""定时消息队列
+
+任务 (好友, 消息, 发送时间, 优先级) 保存在本地 SQLite 中，进程重启后不会丢失。
+由单个调度线程按发送时间和优先级依次发送：没有到期任务时线程阻塞到下一个任务的发送时间，
+队列里有再多未来的任务也只占用一个线程。同一好友的到期任务一起取出，只打开一次聊天窗口。
+
+    python -m app.job_queue add 好友 消息 [--at "2026-10-20 09:00"] [--priority 1]
+    python -m app.job_queue add-file friends.txt 消息 [--at ...]
+    python -m app.job_queue import jobs.csv
+    python -m app.job_queue list
+    python -m app.job_queue run
+"""
+import os
+import csv
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+from app.recipients import clean_recipient, iter_recipients_file
+
+JOB_PENDING = "pending"    # 等待发送时间
+JOB_RUNNING = "running"    # 正在搜索并打开聊天（消息还没有发出，可以安全重试）
+JOB_SENDING = "sending"    # 已触发发送，结果未确认（中途崩溃时可能已经发出，不自动重发）
+JOB_SENT = "sent"
+JOB_FAILED = "failed"      # 重试次数用完
+JOB_CANCELLED = "cancelled"
+
+# 没有新任务通知时，调度线程最长阻塞这么久（秒）后重新查看队列，以便发现其它进程（如命令行）加入的任务
+IDLE_RECHECK = 60.0
+# 发送失败后的重试间隔（秒），按已尝试次数递增
+RETRY_DELAY = 60.0
+# 同一好友一次最多连续发送的任务数
+GROUP_LIMIT = 20
+SEND_AT_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y/%m/%d %H:%M", "%H:%M")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient TEXT NOT NULL,
+    message TEXT NOT NULL,
+    send_at REAL NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (state, send_at, priority);
+"""
+
+
+def parse_send_at(text, now=None):
+    """解析发送时间，空字符串表示立即发送；只给出 HH:MM 时表示今天的这个时间
+
+    返回时间戳，格式错误时抛出 ValueError。
+    """
+    text = (text or "").strip()
+    now = now or datetime.now()
+    if not text:
+        return now.timestamp()
+    for fmt in SEND_AT_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        if fmt == "%H:%M":
+            parsed = datetime.combine(now.date(), parsed.time())
+        return parsed.timestamp()
+    raise ValueError(f"发送时间格式错误（应为 YYYY-MM-DD HH:MM）: {text}")
+
+
+def read_jobs_file(file_path):
+    """读取 CSV 任务文件，表头为 recipient,message[,send_at][,priority]，逐个产出任务 dict"""
+    with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+        for line_no, row in enumerate(csv.DictReader(f), 2):
+            recipient = clean_recipient(row.get("recipient") or "")
+            message = (row.get("message") or "").strip()
+            if not recipient or not message:
+                print(f"{file_path} 第 {line_no} 行缺少好友或消息，已跳过")
+                continue
+            yield {
+                "recipient": recipient,
+                "message": message,
+                "send_at": parse_send_at(row.get("send_at")),
+                "priority": int(row.get("priority") or 0),
+            }
+
+
+class JobQueue:
+    """持久化的定时消息队列（SQLite，WAL 模式）
+
+    加入任务时通知监听者（调度线程据此立即醒来），不需要轮询。
+    """
+    def __init__(self, db_file, clock=time.time):
+        self.db_file = db_file
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # 标记“正在发送”必须在真正发送前落盘，否则崩溃后无法阻止重发
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+
+    def add_listener(self, callback):
+        """注册加入任务后的回调"""
+        self._listeners.append(callback)
+
+    def _notify(self):
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                print(f"任务队列通知失败: {e}")
+
+    def enqueue(self, recipient, message, send_at=None, priority=0):
+        """加入一个任务，send_at 为时间戳（None 表示立即发送），返回任务编号"""
+        return self.enqueue_many([{"recipient": recipient, "message": message,
+                                   "send_at": send_at, "priority": priority}])[0]
+
+    def enqueue_many(self, jobs):
+        """在一个事务中加入多个任务（dict 的可迭代对象），返回任务编号列表"""
+        now = self.clock()
+        ids = []
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for job in jobs:
+                    send_at = job.get("send_at")
+                    cursor = self._conn.execute(
+                        "INSERT INTO jobs (recipient, message, send_at, priority, state, created_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (job["recipient"], job["message"], now if send_at is None else send_at,
+                         int(job.get("priority") or 0), JOB_PENDING, now, now)
+                    )
+                    ids.append(cursor.lastrowid)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if ids:
+            self._notify()
+        return ids
+
+    def claim_due(self, now=None, limit=GROUP_LIMIT):
+        """取出最优先的到期任务（优先级高的先发，同优先级按发送时间）以及同一好友的其它到期任务
+
+        取出的任务标记为正在处理，按发送顺序返回任务 dict 列表；没有到期任务时返回空列表。
+        """
+        now = self.clock() if now is None else now
+        columns = "id, recipient, message, send_at, priority, attempts"
+        order = "ORDER BY priority DESC, send_at, id"
+        with self._lock:
+            # IMMEDIATE 事务：命令行等其它进程同时取任务时不会取到同一个
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = []
+                first = self._conn.execute(
+                    f"SELECT recipient FROM jobs WHERE state = ? AND send_at <= ? {order} LIMIT 1",
+                    (JOB_PENDING, now)
+                ).fetchone()
+                if first:
+                    rows = self._conn.execute(
+                        f"SELECT {columns} FROM jobs WHERE state = ? AND send_at <= ? AND recipient = ? "
+                        f"{order} LIMIT ?",
+                        (JOB_PENDING, now, first[0], limit)
+                    ).fetchall()
+                    self._conn.executemany(
+                        "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        [(JOB_RUNNING, now, row[0]) for row in rows]
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [{"id": row[0], "recipient": row[1], "message": row[2], "send_at": row[3],
+                 "priority": row[4], "attempts": row[5] + 1} for row in rows]
+
+    def next_due_time(self):
+        """最早的待发送任务的发送时间，没有待发送任务时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(send_at) FROM jobs WHERE state = ?", (JOB_PENDING,)
+            ).fetchone()
+        return row[0]
+
+    def mark(self, job_id, state, error=None):
+        """更新任务状态"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, updated_at = ? WHERE id = ?",
+                (state, error, self.clock(), job_id)
+            )
+
+    def retry_later(self, job_id, delay, error=None):
+        """发送失败：放回队列，delay 秒后重试"""
+        now = self.clock()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, send_at = ?, error = ?, updated_at = ? WHERE id = ?",
+                (JOB_PENDING, now + delay, error, now, job_id)
+            )
+
+    def release(self, job_id):
+        """放回尚未尝试发送的任务（不计入尝试次数）"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts - 1, updated_at = ? WHERE id = ? AND state = ?",
+                (JOB_PENDING, self.clock(), job_id, JOB_RUNNING)
+            )
+
+    def cancel(self, job_id):
+        """取消尚未开始的任务，返回是否取消成功"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, updated_at = ? WHERE id = ? AND state = ?",
+                (JOB_CANCELLED, self.clock(), job_id, JOB_PENDING)
+            )
+        return cursor.rowcount > 0
+
+    def recover(self):
+        """启动时处理上次中断的任务：还没发出的放回队列，结果未知的返回其任务编号（不自动重发）"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, updated_at = ? WHERE state = ?",
+                (JOB_PENDING, self.clock(), JOB_RUNNING)
+            )
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE state = ? ORDER BY id", (JOB_SENDING,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def jobs(self, states=(JOB_PENDING,), limit=100):
+        """按发送时间列出指定状态的任务"""
+        marks = ",".join("?" * len(states))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, recipient, message, send_at, priority, state, attempts, error FROM jobs "
+                f"WHERE state IN ({marks}) ORDER BY send_at, priority DESC, id LIMIT ?",
+                (*states, limit)
+            ).fetchall()
+        keys = ("id", "recipient", "message", "send_at", "priority", "state", "attempts", "error")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def summary(self):
+        """各状态的任务数 {状态: 数量}"""
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class DispatcherLease:
+    """调度租约：用锁文件保证同一个队列只有一个进程在调度（界面和命令行不会同时发送定时任务）
+
+    使用操作系统文件锁，持有进程退出或崩溃时自动释放。
+    """
+    def __init__(self, lock_file):
+        self.lock_file = lock_file
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def acquire(self):
+        """尝试取得租约（不等待），返回是否成功"""
+        if self._fd is not None:
+            return True
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.name == "nt":
+                import msvcrt
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode("ascii"))
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if os.name == "nt":
+                import msvcrt
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class JobDispatcher:
+    """任务调度线程：按好友取出到期任务交给 send(jobs, before_send) 发送，没有到期任务时阻塞到下一个发送时间
+
+    send 打开一次聊天后依次发送同一好友的任务，每条消息真正触发发送前调用 before_send(job)，
+    返回 {任务编号: 是否成功}；没有出现在结果中的任务视为未尝试，放回队列。
+    失败的任务在 max_attempts 次以内延后重试。
+    get_pacer() 返回当前的发送节奏控制器：免打扰时段和发送间隔在取出任务之前等待，
+    等待期间任务仍在队列中（可以取消），也不占用发送锁。
+    """
+    def __init__(self, queue, send, on_status=print, max_attempts=3, retry_delay=RETRY_DELAY,
+                 idle_recheck=IDLE_RECHECK, get_pacer=None, clock=time.time):
+        self.queue = queue
+        self.send = send
+        self.get_pacer = get_pacer
+        self.on_status = on_status
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.idle_recheck = idle_recheck
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._quiet = False
+        self._thread = None
+        self.lease = DispatcherLease(queue.db_file + ".lock")
+        queue.add_listener(self.wake)
+
+    def start(self):
+        """启动调度线程（已启动时不重复启动），其它进程已在调度同一个队列时返回 False"""
+        if self._thread and self._thread.is_alive():
+            return True
+        # 先取得租约再恢复中断的任务，否则会把另一个进程正在发送的任务放回队列而重复发送
+        if not self.lease.acquire():
+            self.on_status("另一个进程正在调度定时任务，本进程只负责加入任务")
+            return False
+        uncertain = self.queue.recover()
+        if uncertain:
+            self.on_status(f"以下任务上次发送中断、结果未知，不会自动重发，请人工确认: {uncertain}")
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="job-dispatcher", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=None):
+        """停止调度线程（正在发送的任务会先完成）"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                # 仍在发送中，租约随进程退出释放
+                return
+        self.lease.release()
+
+    def wake(self):
+        """有新任务时唤醒调度线程"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def _next_wait(self):
+        next_at = self.queue.next_due_time()
+        if next_at is None:
+            return self.idle_recheck
+        return min(self.idle_recheck, max(0.0, next_at - self.clock()))
+
+    def _pace(self):
+        """持有条件变量时调用：按免打扰时段和发送节奏等待，返回是否可以立即取出任务"""
+        pacer = self.get_pacer() if self.get_pacer else None
+        if pacer is None:
+            return True
+        quiet = pacer.quiet_delay()
+        if quiet > 0:
+            if not self._quiet:
+                self._quiet = True
+                self.on_status(f"处于免打扰时段，定时任务 {quiet / 60:.0f} 分钟后继续发送")
+            # 定期重新检查，设置修改后的免打扰时段也能生效
+            self._cond.wait(min(quiet, self.idle_recheck))
+            return False
+        if self._quiet:
+            self._quiet = False
+            pacer.resume_after_quiet()
+        deadline = self.clock() + pacer.next_delay()
+        while not self._stopping:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return True
+            self._cond.wait(remaining)
+        return False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                next_at = self.queue.next_due_time()
+                if next_at is None or next_at > self.clock():
+                    self._cond.wait(self._next_wait())
+                    continue
+                if not self._pace():
+                    continue
+                jobs = self.queue.claim_due(self.clock())
+                if not jobs:
+                    continue
+            self.run_group(jobs)
+
+    def run_group(self, jobs):
+        """发送已取出的同一好友的一组任务并记录结果，返回 {任务编号: 是否成功}"""
+        ids = ", ".join(f"#{job['id']}" for job in jobs)
+        self.on_status(f"定时任务 {ids}：发送 {len(jobs)} 条消息给 {jobs[0]['recipient']}")
+        sending = set()
+
+        def before_send(job):
+            sending.add(job["id"])
+            self.queue.mark(job["id"], JOB_SENDING)
+
+        error = None
+        try:
+            results = self.send(jobs, before_send)
+        except Exception as e:
+            # 出错时已经开始的任务按失败处理，其余的放回队列
+            error = str(e)
+            results = {job_id: False for job_id in sending}
+            if jobs[0]["id"] not in results:
+                results[jobs[0]["id"]] = False
+        for job in jobs:
+            if job["id"] in results:
+                self._record(job, results[job["id"]], job["id"] in sending, error or "发送失败")
+            else:
+                self.queue.release(job["id"])
+        return results
+
+    def _record(self, job, sent, triggered, error):
+        if sent:
+            self.queue.mark(job["id"], JOB_SENT)
+        elif triggered:
+            # 已触发发送，消息可能已经发出：保留“发送中”状态，不自动重发
+            self.queue.mark(job["id"], JOB_SENDING, error)
+            self.on_status(f"定时任务 #{job['id']} 发送结果未知: {error}")
+        elif job["attempts"] < self.max_attempts:
+            delay = self.retry_delay * job["attempts"]
+            self.queue.retry_later(job["id"], delay, error)
+            self.on_status(f"定时任务 #{job['id']} 失败，{delay:.0f} 秒后重试: {error}")
+        else:
+            self.queue.mark(job["id"], JOB_FAILED, error)
+            self.on_status(f"定时任务 #{job['id']} 失败，不再重试: {error}")
+
+
+def _format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="微信定时消息队列")
+    parser.add_argument("--db", help="队列数据库文件（默认使用配置中的 job_queue_file）")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="加入一条消息")
+    add.add_argument("recipient")
+    add.add_argument("message")
+    add.add_argument("--at", default="", help="发送时间 YYYY-MM-DD HH:MM（默认立即）")
+    add.add_argument("--priority", type=int, default=0, help="优先级，越大越先发")
+    add_file = commands.add_parser("add-file", help="给好友文件中的每位好友加入同一条消息")
+    add_file.add_argument("friends_file")
+    add_file.add_argument("message")
+    add_file.add_argument("--at", default="")
+    add_file.add_argument("--priority", type=int, default=0)
+    import_file = commands.add_parser("import", help="导入 CSV 任务文件（recipient,message,send_at,priority）")
+    import_file.add_argument("jobs_file")
+    commands.add_parser("list", help="列出待发送的任务")
+    cancel = commands.add_parser("cancel", help="取消任务")
+    cancel.add_argument("job_id", type=int)
+    commands.add_parser("run", help="启动调度线程，按时发送队列中的任务（Ctrl+C 退出）")
+    args = parser.parse_args(argv)
+
+    from app.wechat_auto import ConfigManager, resolve_data_path
+    config = ConfigManager.load_config()
+    queue = JobQueue(args.db or resolve_data_path(config["job_queue_file"]))
+
+    if args.command == "add":
+        job_id = queue.enqueue(args.recipient, args.message, parse_send_at(args.at), args.priority)
+        print(f"已加入任务 #{job_id}")
+    elif args.command == "add-file":
+        send_at = parse_send_at(args.at)
+        ids = queue.enqueue_many({"recipient": friend, "message": args.message,
+                                  "send_at": send_at, "priority": args.priority}
+                                 for friend in iter_recipients_file(args.friends_file))
+        print(f"已加入 {len(ids)} 个任务")
+    elif args.command == "import":
+        ids = queue.enqueue_many(read_jobs_file(args.jobs_file))
+        print(f"已导入 {len(ids)} 个任务")
+    elif args.command == "list":
+        for job in queue.jobs(limit=1000):
+            print(f"#{job['id']:<6}{_format_time(job['send_at'])}  优先级 {job['priority']:<3}"
+                  f"{job['recipient']}: {job['message'][:30]}")
+        print(f"任务统计: {queue.summary()}")
+    elif args.command == "cancel":
+        print("已取消" if queue.cancel(args.job_id) else "任务不存在或已经开始发送")
+    elif args.command == "run":
+        from app.wechat_auto import WeChatAuto
+        wechat = WeChatAuto(config)
+        dispatcher = JobDispatcher(queue, wechat.send_queued_jobs, max_attempts=config["job_max_attempts"],
+                                   get_pacer=lambda: wechat.pacer)
+        if not dispatcher.start():
+            queue.close()
+            return 1
+        print("调度线程已启动，按 Ctrl+C 退出")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            dispatcher.stop()
+    queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
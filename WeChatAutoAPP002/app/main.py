@@ -1,9 +1,13 @@
 import sys
 import os
+import itertools
 # from PyQt5.QtWidgets import QApplication, QMessageBox
 from PyQt5.QtCore import QThread, pyqtSignal
 from app.ui_main import MainWindow
-from app.wechat_auto import WeChatAuto, ConfigManager
+from app.wechat_auto import WeChatAuto, ConfigManager, resolve_data_path
+from app.recipients import iter_recipients_file
+from app.job_queue import JobQueue, JobDispatcher
+from app.batch_journal import STATE_SENT, STATE_FAILED, STATE_SENDING
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                            QTabWidget, QLabel, QLineEdit, QTextEdit, QPushButton,
                            QGroupBox, QProgressBar, QSplitter, QFormLayout,
@@ -36,6 +40,15 @@ class WeChatApp:
         self.window = MainWindow()
         self.config = ConfigManager.load_config()
         self.wechat_auto = WeChatAuto(self.config)
+        # 定时消息队列：后台调度线程按时发送，发送时使用当前的自动化实例
+        self.job_queue = JobQueue(resolve_data_path(self.config["job_queue_file"]))
+        self.dispatcher = JobDispatcher(
+            self.job_queue,
+            lambda jobs, before_send: self.wechat_auto.send_queued_jobs(jobs, before_send),
+            on_status=lambda message: self.wechat_auto.status_updated.emit(message),
+            max_attempts=self.config["job_max_attempts"],
+            get_pacer=lambda: self.wechat_auto.pacer
+        )
         self.setup_signals()
         self.load_config_to_ui()
         
@@ -47,6 +60,10 @@ class WeChatApp:
         # 批量发送按钮
         self.window.send_batch_btn.clicked.connect(self.send_batch_messages)
         
+        # 定时发送按钮
+        self.window.enqueue_single_btn.clicked.connect(self.enqueue_single_message)
+        self.window.enqueue_batch_btn.clicked.connect(self.enqueue_batch_messages)
+        
         # 设置相关
         self.window.wechat_path_btn.clicked.connect(self.browse_wechat_path)
         self.window.template_path_btn.clicked.connect(self.browse_template_path)
@@ -63,6 +80,13 @@ class WeChatApp:
         self.window.template_path_input.setText(self.config["template_path"])
         self.window.friends_file_input.setText(self.config["friends_file"])
         self.window.pyautogui_pause.setValue(self.config["pyautogui_pause"])
+        self.window.input_profile.setCurrentIndex(
+            max(0, self.window.input_profile.findData(self.config["input_profile"]))
+        )
+        self.window.pacing_rate_per_min.setValue(self.config["pacing_rate_per_min"])
+        self.window.pacing_burst.setValue(self.config["pacing_burst"])
+        self.window.pacing_jitter.setValue(self.config["pacing_jitter"])
+        self.window.pacing_quiet_hours.setText(self.config["pacing_quiet_hours"])
         self.window.use_hybrid_mode.setChecked(self.config["use_hybrid_mode"])
         self.window.auto_login_wait_time.setValue(self.config["auto_login_wait_time"])
         self.window.retry_times.setValue(self.config["retry_times"])
@@ -72,23 +96,48 @@ class WeChatApp:
         self.window.friends_file_info.setText(
             f"当前好友文件: {self.config['friends_file']}"
         )
+        self.update_last_batch_info()
+    
+    def update_last_batch_info(self):
+        """显示上次批量发送的批次和进度"""
+        last = self.wechat_auto.journal.last_campaign()
+        if last is None:
+            self.window.last_batch_info.setText("暂无批量发送记录")
+            return
+        summary = self.wechat_auto.journal.summary(last["campaign"])
+        status = "已完成" if last["finished_at"] else "未完成"
+        self.window.last_batch_info.setText(
+            f"上次批次 {last['campaign']}（{status}）: {last['message'][:20]}\n"
+            f"已发送 {summary.get(STATE_SENT, 0)}，失败 {summary.get(STATE_FAILED, 0)}，"
+            f"结果未知 {summary.get(STATE_SENDING, 0)}"
+        )
     
     def save_settings(self):
         """保存设置到配置文件"""
-        new_config = {
+        # 在原配置基础上更新，保留界面上没有的配置项
+        new_config = dict(self.config)
+        new_config.update({
             "wechat_path": self.window.wechat_path_input.text(),
             "template_path": self.window.template_path_input.text(),
             "friends_file": self.window.friends_file_input.text(),
             "pyautogui_pause": self.window.pyautogui_pause.value(),
+            "input_profile": self.window.input_profile.currentData(),
+            "pacing_rate_per_min": self.window.pacing_rate_per_min.value(),
+            "pacing_burst": self.window.pacing_burst.value(),
+            "pacing_jitter": self.window.pacing_jitter.value(),
+            "pacing_quiet_hours": self.window.pacing_quiet_hours.text().strip(),
             "use_hybrid_mode": self.window.use_hybrid_mode.isChecked(),
             "auto_login_wait_time": self.window.auto_login_wait_time.value(),
             "retry_times": self.window.retry_times.value(),
             "confidence": self.window.confidence.value()
-        }
+        })
         
         if ConfigManager.save_config(new_config):
             self.config = new_config
-            self.wechat_auto = WeChatAuto(new_config)
+            # 新实例从文件加载点击策略统计，先写入旧实例尚未保存的统计
+            self.wechat_auto.strategy_stats.flush()
+            # 日志数据库路径不随界面设置变化，新实例沿用旧实例的连接，不再打开新连接
+            self.wechat_auto = WeChatAuto(new_config, journal=self.wechat_auto.journal)
             self.wechat_auto.status_updated.connect(self.update_log)
             self.wechat_auto.progress_updated.connect(self.update_progress)
             self.window.statusBar().showMessage("设置保存成功")
@@ -146,18 +195,30 @@ class WeChatApp:
         self.worker.start()
     
     def send_batch_messages(self):
-        message = self.window.batch_msg_editor.toPlainText().strip()
-        if not message:
-            self.show_error("请输入消息内容")
-            return
-        # 读取好友列表文件
+        campaign = None
+        friends_file = self.config["friends_file"]
+        if self.window.batch_mode.currentData() == "resume":
+            # 续发：沿用上次批次的消息和好友文件
+            last = self.wechat_auto.journal.last_campaign()
+            if last is None:
+                self.show_error("没有可以续发的批次")
+                return
+            campaign = last["campaign"]
+            message = last["message"]
+            friends_file = last["source"] or friends_file
+        else:
+            message = self.window.batch_msg_editor.toPlainText().strip()
+            if not message:
+                self.show_error("请输入消息内容")
+                return
+        # 流式读取好友列表文件（跳过注释、规范化、去重），发送过程中边读边发
         try:
-            with open(self.config["friends_file"], 'r', encoding='utf-8') as f:
-                friend_list = [line.strip() for line in f if line.strip()]
-            
-            if not friend_list:
+            friends = iter_recipients_file(friends_file)
+            first = next(friends, None)
+            if first is None:
                 self.show_error("好友列表为空，请检查好友文件")
                 return
+            friend_list = itertools.chain([first], friends)
         except Exception as e:
             self.show_error(f"读取好友文件失败: {str(e)}")
             return
@@ -172,13 +233,54 @@ class WeChatApp:
         self.batch_worker = WorkerThread(
             self.wechat_auto.send_batch_messages,
             friend_list,  # 第一个参数：好友列表
-            message       # 第二个参数：消息内容
+            message,      # 第二个参数：消息内容
+            campaign=campaign,
+            source=friends_file
         )
         self.batch_worker.log_signal.connect(self.window.batch_log_text.append)
         self.batch_worker.progress_signal.connect(self.window.batch_progress_bar.setValue)
         self.batch_worker.finished_signal.connect(lambda: self.window.send_batch_btn.setEnabled(True))
+        self.batch_worker.finished_signal.connect(lambda: self.update_last_batch_info())
         self.batch_worker.start()
     
+    def enqueue_single_message(self):
+        """把单好友消息加入定时队列"""
+        friend_name = self.window.friend_input.text().strip()
+        message = self.window.msg_editor.toPlainText().strip()
+        if not friend_name:
+            self.show_error("请输入好友名称")
+            return
+        if not message:
+            self.show_error("请输入消息内容")
+            return
+        job_id = self.job_queue.enqueue(
+            friend_name, message,
+            send_at=self.window.schedule_time.dateTime().toSecsSinceEpoch(),
+            priority=self.window.job_priority.value()
+        )
+        self.window.statusBar().showMessage(f"已加入定时任务 #{job_id}")
+    
+    def enqueue_batch_messages(self):
+        """为好友文件中的每位好友加入一个定时任务"""
+        message = self.window.batch_msg_editor.toPlainText().strip()
+        if not message:
+            self.show_error("请输入消息内容")
+            return
+        send_at = self.window.batch_schedule_time.dateTime().toSecsSinceEpoch()
+        priority = self.window.batch_job_priority.value()
+        try:
+            ids = self.job_queue.enqueue_many(
+                {"recipient": friend, "message": message, "send_at": send_at, "priority": priority}
+                for friend in iter_recipients_file(self.config["friends_file"])
+            )
+        except Exception as e:
+            self.show_error(f"加入定时队列失败: {str(e)}")
+            return
+        if not ids:
+            self.show_error("好友列表为空，请检查好友文件")
+            return
+        self.window.statusBar().showMessage(f"已加入 {len(ids)} 个定时任务")
+    
     def update_log(self, message):
         """根据当前激活的标签页更新对应日志"""
         current_tab = self.window.tabs.currentIndex()
@@ -200,7 +302,11 @@ class WeChatApp:
     
     def run(self):
         self.window.show()
-        sys.exit(self.app.exec_())
+        self.dispatcher.start()
+        exit_code = self.app.exec_()
+        self.dispatcher.stop(timeout=5)
+        self.wechat_auto.strategy_stats.flush()
+        sys.exit(exit_code)
 
 def main():
     app = WeChatApp()
@@ -0,0 +1,174 @@
+import time
+import random
+import threading
+from datetime import datetime, timedelta
+from collections import deque
+
+# 失败率统计窗口：最近多少次发送
+FAILURE_WINDOW = 10
+# 窗口内至少有这么多次发送才判断失败率，避免一两次失败就降速
+FAILURE_MIN_SAMPLES = 3
+# 降速倍数上限（发送间隔最多拉长到正常的这么多倍）
+MAX_SLOWDOWN = 8.0
+# 每次成功发送后降速倍数的恢复比例
+SLOWDOWN_RECOVERY = 0.8
+# 实时速度的统计窗口（秒）
+THROUGHPUT_WINDOW = 60.0
+
+
+def parse_quiet_hours(text):
+    """解析免打扰时段 "HH:MM-HH:MM"（可以跨午夜，如 22:00-08:00），空字符串返回 None
+
+    格式错误时抛出 ValueError。
+    """
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        start, end = (part.strip() for part in text.split("-"))
+        start = datetime.strptime(start, "%H:%M").time()
+        end = datetime.strptime(end, "%H:%M").time()
+    except ValueError:
+        raise ValueError(f"免打扰时段格式错误（应为 HH:MM-HH:MM）: {text}")
+    if start == end:
+        raise ValueError(f"免打扰时段的开始和结束时间不能相同: {text}")
+    return start, end
+
+
+def quiet_seconds_left(quiet_hours, now):
+    """当前处于免打扰时段时返回距离时段结束的秒数，否则返回 0"""
+    if quiet_hours is None:
+        return 0.0
+    start, end = quiet_hours
+    current = now.time()
+    if start < end:
+        inside = start <= current < end
+    else:
+        inside = current >= start or current < end
+    if not inside:
+        return 0.0
+    end_at = datetime.combine(now.date(), end)
+    if end_at <= now:
+        end_at += timedelta(days=1)
+    return (end_at - now).total_seconds()
+
+
+class PacingController:
+    """发送节奏控制：令牌桶限制持续速度和突发数量，附加随机抖动，遇到失败激增时自动降速
+
+    wait() 在每次发送前调用，record(success) 在发送后调用；throughput() 返回最近一分钟的实际速度（条/分钟）。
+    需要自己安排等待的调用方（如任务调度线程）可以分别使用 quiet_delay()、resume_after_quiet() 和 next_delay()。
+    """
+    def __init__(self, rate_per_min=20, burst=3, jitter=0.3, quiet_hours="", failure_threshold=0.5,
+                 clock=time.monotonic, now=datetime.now, sleep=time.sleep, rng=None):
+        self.rate_per_min = max(0.1, float(rate_per_min))
+        self.burst = max(1, int(burst))
+        self.jitter = min(1.0, max(0.0, float(jitter)))
+        self.failure_threshold = failure_threshold
+        try:
+            self.quiet_hours = parse_quiet_hours(quiet_hours)
+        except ValueError as e:
+            print(f"{e}，不启用免打扰时段")
+            self.quiet_hours = None
+        self.clock = clock
+        self.now = now
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.slowdown = 1.0  # 当前降速倍数，1 表示正常速度
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._outcomes = deque(maxlen=FAILURE_WINDOW)
+        self._sent_times = deque()
+        self._started = None
+        self._lock = threading.Lock()
+
+    @property
+    def interval(self):
+        """当前的平均发送间隔（秒），已计入降速倍数"""
+        return 60.0 / self.rate_per_min * self.slowdown
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        if elapsed > 0:
+            self._tokens = min(float(self.burst), self._tokens + elapsed / self.interval)
+
+    def next_delay(self):
+        """下一次发送前需要等待的秒数（不含免打扰时段），并预先扣除一个令牌"""
+        with self._lock:
+            self._refill(self.clock())
+            self._tokens -= 1.0
+            delay = -self._tokens * self.interval if self._tokens < 0 else 0.0
+            if self.jitter:
+                delay += self.rng.uniform(0, self.jitter * self.interval)
+            return delay
+
+    def quiet_delay(self):
+        """当前处于免打扰时段时返回距离时段结束的秒数，否则返回 0"""
+        return quiet_seconds_left(self.quiet_hours, self.now())
+
+    def resume_after_quiet(self):
+        """免打扰时段结束后调用：免打扰期间不积攒令牌，恢复后从一个令牌开始"""
+        with self._lock:
+            self._tokens = min(self._tokens, 1.0)
+            self._updated = self.clock()
+
+    def wait(self, on_status=None):
+        """发送前等待：先等免打扰时段结束，再按令牌桶和抖动等待，返回实际等待的秒数"""
+        waited = 0.0
+        quiet = self.quiet_delay()
+        if quiet > 0:
+            if on_status:
+                on_status(f"处于免打扰时段，{quiet / 60:.0f} 分钟后继续发送")
+            self.sleep(quiet)
+            waited += quiet
+            self.resume_after_quiet()
+        return waited + self.throttle(on_status)
+
+    def throttle(self, on_status=None):
+        """只按令牌桶和抖动等待（不检查免打扰时段），返回实际等待的秒数"""
+        delay = self.next_delay()
+        if delay > 0:
+            if on_status and delay >= 1:
+                on_status(f"控制发送节奏，等待 {delay:.1f} 秒...")
+            self.sleep(delay)
+        return max(0.0, delay)
+
+    def record(self, success):
+        """记录一次发送结果；最近失败率超过阈值时降速并清空令牌，成功时逐步恢复"""
+        with self._lock:
+            now = self.clock()
+            if self._started is None:
+                self._started = now
+            self._outcomes.append(bool(success))
+            if success:
+                self._sent_times.append(now)
+                self.slowdown = max(1.0, self.slowdown * SLOWDOWN_RECOVERY)
+                return
+            failures = self._outcomes.count(False)
+            if (len(self._outcomes) >= FAILURE_MIN_SAMPLES
+                    and failures / len(self._outcomes) >= self.failure_threshold):
+                self._refill(now)
+                self.slowdown = min(MAX_SLOWDOWN, self.slowdown * 2)
+                self._tokens = 0.0
+
+    def throughput(self):
+        """最近一分钟的实际发送速度（条/分钟），刚开始发送时按已用时间折算"""
+        with self._lock:
+            if self._started is None:
+                return 0.0
+            now = self.clock()
+            while self._sent_times and now - self._sent_times[0] > THROUGHPUT_WINDOW:
+                self._sent_times.popleft()
+            span = min(THROUGHPUT_WINDOW, max(now - self._started, 1.0))
+            return len(self._sent_times) * 60.0 / span
+
+    def reset(self):
+        """开始新的批量发送：令牌装满，清空统计"""
+        with self._lock:
+            self.slowdown = 1.0
+            self._tokens = float(self.burst)
+            self._updated = self.clock()
+            self._outcomes.clear()
+            self._sent_times.clear()
+            self._started = None
@@ -0,0 +1,78 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# 进程内共用的定位线程池（按线程数区分）：保存设置会重建自动化实例，不能每次都新建线程池
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def create_locate_executor(workers):
+    """获取共用的定位线程池，workers 不大于 1 时返回 None（串行模式）"""
+    if not workers or workers <= 1:
+        return None
+    with _executors_lock:
+        executor = _executors.get(workers)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="locate")
+            _executors[workers] = executor
+        return executor
+
+
+def best_of_jobs(executor, jobs, evaluate, score, decisive):
+    """并行评估有序任务列表，返回 (序号, 结果)，无结果时返回 (None, None)
+
+    - evaluate(job) 返回结果或 None；OpenCV 计算会释放 GIL，可以真正并行
+    - 某个任务结果满足 decisive 时，取消排在它后面的任务
+    - 结果与线程调度无关：有决定性结果时取序号最小的那个，
+      否则取 score 最高者，同分取序号最小者
+    """
+    if not jobs:
+        return None, None
+
+    lock = threading.Lock()
+    stop_index = [len(jobs)]  # 第一个决定性结果的序号
+
+    def run(index, job):
+        with lock:
+            if index > stop_index[0]:
+                return None
+        result = evaluate(job)
+        if result is not None and decisive(result):
+            with lock:
+                stop_index[0] = min(stop_index[0], index)
+        return result
+
+    if executor is None:
+        results = {}
+        for index, job in enumerate(jobs):
+            results[index] = run(index, job)
+            if index >= stop_index[0]:
+                break
+    else:
+        futures = {executor.submit(run, index, job): index for index, job in enumerate(jobs)}
+        pending = set(futures)
+        results = {}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if not future.cancelled():
+                    results[futures[future]] = future.result()
+            # 取消决定性结果之后尚未开始的任务
+            with lock:
+                stop = stop_index[0]
+            for future in list(pending):
+                if futures[future] > stop and future.cancel():
+                    pending.discard(future)
+
+    stop = stop_index[0]
+    if stop < len(jobs):
+        return stop, results[stop]
+
+    best_index, best_result = None, None
+    for index in sorted(results):
+        result = results[index]
+        if result is None:
+            continue
+        if best_result is None or score(result) > score(best_result):
+            best_index, best_result = index, result
+    return best_index, best_result
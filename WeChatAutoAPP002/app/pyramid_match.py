@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+# 粗匹配时依次尝试的降采样倍数
+PYRAMID_FACTORS = (4, 2)
+# 降采样后模板的最小边长，太小会丢失特征
+MIN_COARSE_SIZE = 12
+# 搜索区域小于该像素数时直接全分辨率匹配，金字塔反而更慢
+MIN_PYRAMID_AREA = 200000
+# 粗匹配保留的候选位置数量
+DEFAULT_TOP_K = 3
+
+
+def exhaustive_match(screen_gray, template):
+    """全分辨率穷举匹配，返回 (置信度, (x, y))"""
+    result = cv2.matchTemplate(screen_gray, template, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return max_val, max_loc
+
+
+def choose_factor(template_shape):
+    """选择能保证模板降采样后不小于最小边长的最大倍数"""
+    height, width = template_shape[:2]
+    for factor in PYRAMID_FACTORS:
+        if width // factor >= MIN_COARSE_SIZE and height // factor >= MIN_COARSE_SIZE:
+            return factor
+    return 1
+
+
+def _top_candidates(result, top_k, suppress_w, suppress_h):
+    """从粗匹配结果中取前 top_k 个峰值，相邻峰值做非极大值抑制"""
+    result = result.copy()
+    candidates = []
+    for _ in range(top_k):
+        _, max_val, _, (x, y) = cv2.minMaxLoc(result)
+        if not np.isfinite(max_val) or max_val <= -1:
+            break
+        candidates.append((x, y))
+        result[max(0, y - suppress_h):y + suppress_h + 1,
+               max(0, x - suppress_w):x + suppress_w + 1] = -1
+    return candidates
+
+
+def pyramid_match(screen_gray, template, top_k=DEFAULT_TOP_K, factor=None):
+    """由粗到细的模板匹配：先在降采样图上找候选，再在全分辨率小窗口内精确定位
+
+    返回值与 exhaustive_match 相同：(置信度, (x, y))，坐标为全分辨率坐标。
+    """
+    screen_h, screen_w = screen_gray.shape[:2]
+    tpl_h, tpl_w = template.shape[:2]
+    factor = factor or choose_factor(template.shape)
+    if factor <= 1 or screen_w * screen_h < MIN_PYRAMID_AREA:
+        return exhaustive_match(screen_gray, template)
+
+    small_screen = cv2.resize(screen_gray, (screen_w // factor, screen_h // factor),
+                              interpolation=cv2.INTER_AREA)
+    small_tpl = cv2.resize(template, (tpl_w // factor, tpl_h // factor),
+                           interpolation=cv2.INTER_AREA)
+    if (small_tpl.shape[0] > small_screen.shape[0] or
+            small_tpl.shape[1] > small_screen.shape[1]):
+        return exhaustive_match(screen_gray, template)
+
+    coarse = cv2.matchTemplate(small_screen, small_tpl, cv2.TM_CCOEFF_NORMED)
+    candidates = _top_candidates(coarse, top_k,
+                                 max(1, small_tpl.shape[1] // 2),
+                                 max(1, small_tpl.shape[0] // 2))
+
+    # 在每个候选点附近的全分辨率小窗口内精确匹配
+    margin = factor * 2
+    best_val, best_loc = -1.0, (0, 0)
+    for cx, cy in candidates:
+        x0 = max(0, cx * factor - margin)
+        y0 = max(0, cy * factor - margin)
+        x1 = min(screen_w, cx * factor + margin + tpl_w)
+        y1 = min(screen_h, cy * factor + margin + tpl_h)
+        if x1 - x0 < tpl_w or y1 - y0 < tpl_h:
+            continue
+        val, (x, y) = exhaustive_match(screen_gray[y0:y1, x0:x1], template)
+        if val > best_val:
+            best_val, best_loc = val, (x0 + x, y0 + y)
+
+    if not candidates or best_val < 0:
+        return exhaustive_match(screen_gray, template)
+    return best_val, best_loc
+
+
+def compare_with_exhaustive(screen_gray, template, tolerance=2):
+    """精度校验：对比金字塔匹配与穷举匹配的结果"""
+    start = time.perf_counter()
+    exact_val, exact_loc = exhaustive_match(screen_gray, template)
+    exact_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fast_val, fast_loc = pyramid_match(screen_gray, template)
+    fast_time = time.perf_counter() - start
+
+    offset = max(abs(exact_loc[0] - fast_loc[0]), abs(exact_loc[1] - fast_loc[1]))
+    return {
+        'exhaustive': (exact_val, exact_loc, exact_time),
+        'pyramid': (fast_val, fast_loc, fast_time),
+        'offset': offset,
+        'agree': offset <= tolerance and abs(exact_val - fast_val) < 0.02,
+    }
+
+
+def main():
+    """用模板目录中的整窗截图（001.png）校验金字塔匹配精度"""
+    template_path = sys.argv[1] if len(sys.argv) > 1 else "wechat_templates"
+    all_agree = True
+    for mode in ("light", "dark"):
+        mode_path = os.path.join(template_path, mode)
+        screen = cv2.imread(os.path.join(mode_path, "001.png"), cv2.IMREAD_GRAYSCALE)
+        if screen is None:
+            continue
+        for name in sorted(os.listdir(mode_path)):
+            if name == "001.png" or not name.endswith(".png"):
+                continue
+            template = cv2.imread(os.path.join(mode_path, name), cv2.IMREAD_GRAYSCALE)
+            if template is None:
+                continue
+            report = compare_with_exhaustive(screen, template)
+            exact_val, exact_loc, exact_time = report['exhaustive']
+            fast_val, fast_loc, fast_time = report['pyramid']
+            status = "一致" if report['agree'] else "不一致"
+            print(f"{mode}/{name}: 穷举 {exact_val:.3f}@{exact_loc} {exact_time * 1000:.1f}ms | "
+                  f"金字塔 {fast_val:.3f}@{fast_loc} {fast_time * 1000:.1f}ms | {status}")
+            all_agree = all_agree and report['agree']
+    return 0 if all_agree else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import re
+import hashlib
+from collections import deque
+
+COMMENT_PREFIX = "#"
+# 去重集合最多记住的好友数，超出后淘汰最早的记录（重复发送仍由批量发送日志的幂等键兜底）
+DEFAULT_MAX_SEEN = 500000
+# 零宽字符和 BOM，复制粘贴的名单里经常夹带
+_INVISIBLE = re.compile("[\u200b\u200c\u200d\u2060\ufeff]")
+_WHITESPACE = re.compile(r"\s+")
+# 全角 ASCII（！到～）和全角空格转为半角；不用 NFKC，避免把 ①、™、² 等不同字符并成同一个名字
+_FULLWIDTH = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+_FULLWIDTH[0x3000] = 0x20
+# 微信表情文字，如 [猪头]、[ 猪头 ]（全角［］转半角后也会变成 []）
+_EMOJI_TOKEN = re.compile(r"\[\s*([^\[\]]+?)\s*\]")
+
+
+def clean_recipient(line):
+    """清理一行好友名称：去除零宽字符和首尾空白，名称本身保持原样（用于搜索和发送）
+
+    空行和注释行返回 None。
+    """
+    text = _INVISIBLE.sub("", line).strip()
+    if not text or text.startswith(COMMENT_PREFIX):
+        return None
+    return text
+
+
+def normalize_recipient(line):
+    """好友名称的去重键：全角 ASCII 转半角、去除零宽字符、合并空白、统一表情写法
+
+    只用于判断两行是否为同一好友，不用作搜索文本（搜索时使用 clean_recipient 的结果）。
+    空行和注释行返回 None。
+    """
+    text = _INVISIBLE.sub("", line).translate(_FULLWIDTH)
+    text = _WHITESPACE.sub(" ", text).strip()
+    if not text or text.startswith(COMMENT_PREFIX):
+        return None
+    return _EMOJI_TOKEN.sub(lambda m: f"[{m.group(1)}]", text)
+
+
+class BoundedSeenSet:
+    """内存有上限的去重集合：只保存 8 字节摘要，超过 max_entries 时淘汰最早加入的记录"""
+    def __init__(self, max_entries=DEFAULT_MAX_SEEN):
+        self.max_entries = max_entries
+        self._digests = set()
+        self._order = deque()
+        self.evicted = 0
+
+    @staticmethod
+    def _digest(value):
+        return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+    def add(self, value):
+        """加入集合，已存在时返回 False"""
+        digest = self._digest(value)
+        if digest in self._digests:
+            return False
+        self._digests.add(digest)
+        self._order.append(digest)
+        if len(self._order) > self.max_entries:
+            self._digests.discard(self._order.popleft())
+            self.evicted += 1
+        return True
+
+    def __len__(self):
+        return len(self._digests)
+
+
+class IngestStats:
+    """名单读取统计"""
+    def __init__(self):
+        self.lines = 0
+        self.skipped = 0     # 空行和注释行
+        self.duplicates = 0
+        self.recipients = 0
+
+    def __str__(self):
+        return (f"共 {self.lines} 行，有效好友 {self.recipients} 个，"
+                f"跳过空行/注释 {self.skipped} 行，重复 {self.duplicates} 个")
+
+
+def iter_recipients(lines, max_seen=DEFAULT_MAX_SEEN, stats=None):
+    """从可迭代的文本行中逐个产出去重后的好友名称（按规范化的名称去重，产出原始名称）"""
+    seen = BoundedSeenSet(max_seen)
+    for line in lines:
+        if stats:
+            stats.lines += 1
+        name = clean_recipient(line)
+        key = normalize_recipient(name) if name is not None else None
+        if key is None:
+            if stats:
+                stats.skipped += 1
+            continue
+        if not seen.add(key):
+            if stats:
+                stats.duplicates += 1
+            continue
+        if stats:
+            stats.recipients += 1
+        yield name
+
+
+def iter_recipients_file(file_path, max_seen=DEFAULT_MAX_SEEN, stats=None):
+    """逐行流式读取好友文件，不把整个文件读入内存"""
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+        yield from iter_recipients(f, max_seen, stats)
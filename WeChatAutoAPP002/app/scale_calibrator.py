@@ -0,0 +1,55 @@
+import threading
+from app.template_store import DEFAULT_SCALES
+
+
+class ScaleCalibrator:
+    """会话级尺度校准：按元素记录首次成功匹配的尺度，之后只尝试该尺度及相邻档位
+
+    不同元素的模板截取时的缩放可能不同，所以每个元素单独校准。
+    显示器分辨率、窗口大小或窗口所在显示器变化（通常意味着 DPI 缩放变化）时全部失效。
+    """
+    def __init__(self, scales=DEFAULT_SCALES, neighbors=1):
+        self.scales = tuple(scales)
+        self.neighbors = neighbors
+        self.environment = None
+        self._scales = {}  # 元素 -> 校准尺度
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_environment(frame_size, window):
+        """显示环境标识：屏幕尺寸 + 窗口尺寸 + 窗口所在显示器"""
+        if not window:
+            return (tuple(frame_size), None)
+        return (tuple(frame_size), (window['width'], window['height'], window.get('monitor')))
+
+    def candidate_scales(self, environment, element):
+        """返回元素本次应尝试的尺度列表；未校准或环境已变化时返回 None（尝试全部尺度）"""
+        with self._lock:
+            if environment != self.environment:
+                self._scales = {}
+                self.environment = None
+                return None
+            scale = self._scales.get(element)
+            if scale is None:
+                return None
+            index = self.scales.index(scale)
+            start = max(0, index - self.neighbors)
+            return list(self.scales[start:index + self.neighbors + 1])
+
+    def record(self, environment, element, scale):
+        """记录元素一次成功匹配的尺度，返回校准结果是否发生变化"""
+        if scale not in self.scales:
+            return False
+        with self._lock:
+            if environment != self.environment:
+                self._scales = {}
+                self.environment = environment
+            changed = self._scales.get(element) != scale
+            self._scales[element] = scale
+            return changed
+
+    def reset(self):
+        """清除校准结果"""
+        with self._lock:
+            self._scales = {}
+            self.environment = None
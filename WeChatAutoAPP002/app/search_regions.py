@@ -0,0 +1,73 @@
+# 各元素在微信窗口中的默认预期区域（相对窗口比例：左, 上, 右, 下）
+DEFAULT_ELEMENT_ZONES = {
+    "search_icon": (0.0, 0.0, 0.5, 0.2),       # 左上角搜索栏
+    "message_input": (0.25, 0.6, 1.0, 1.0),    # 聊天区底部输入框
+    "send_button": (0.55, 0.75, 1.0, 1.0),     # 聊天区右下角发送按钮
+}
+
+
+def clamp_region(region, bounds):
+    """将 (left, top, width, height) 裁剪到帧覆盖的屏幕范围 bounds 内，无交集时返回 None"""
+    bounds_left, bounds_top, bounds_w, bounds_h = bounds
+    left, top, width, height = region
+    right = min(left + width, bounds_left + bounds_w)
+    bottom = min(top + height, bounds_top + bounds_h)
+    left = max(left, bounds_left)
+    top = max(top, bounds_top)
+    if right <= left or bottom <= top:
+        return None
+    return (left, top, right - left, bottom - top)
+
+
+class SearchRegionPlanner:
+    """搜索区域规划：元素预期区域 -> 微信窗口 -> 全屏（最后手段）"""
+    def __init__(self, zones=None):
+        self.zones = dict(DEFAULT_ELEMENT_ZONES)
+        if zones:
+            self.zones.update(zones)
+
+    def zone_region(self, element, window):
+        """根据窗口坐标计算元素预期区域的绝对坐标"""
+        zone = self.zones.get(element)
+        if not zone or not window:
+            return None
+        rel_left, rel_top, rel_right, rel_bottom = zone
+        left = window['left'] + int(window['width'] * rel_left)
+        top = window['top'] + int(window['height'] * rel_top)
+        right = window['left'] + int(window['width'] * rel_right)
+        bottom = window['top'] + int(window['height'] * rel_bottom)
+        return (left, top, right - left, bottom - top)
+
+    def regions(self, element, window, bounds, include_full_screen=True):
+        """按由小到大的顺序返回 [(区域名, (left, top, width, height)), ...]，bounds 为帧覆盖的屏幕范围"""
+        candidates = []
+        if window:
+            candidates.append(("zone", self.zone_region(element, window)))
+            candidates.append(("window", (window['left'], window['top'],
+                                          window['width'], window['height'])))
+        if include_full_screen:
+            candidates.append(("screen", tuple(bounds)))
+
+        regions = []
+        for name, region in candidates:
+            if region is None:
+                continue
+            region = clamp_region(region, bounds)
+            if region is not None and region not in [r for _, r in regions]:
+                regions.append((name, region))
+        return regions
+
+    def learn(self, element, window, match):
+        """根据成功匹配的位置更新元素预期区域（四周各留一个元素大小的余量）"""
+        if not window or window['width'] <= 0 or window['height'] <= 0:
+            return
+        left = match.left - match.width - window['left']
+        top = match.top - match.height - window['top']
+        right = match.left + match.width * 2 - window['left']
+        bottom = match.top + match.height * 2 - window['top']
+        self.zones[element] = (
+            max(0.0, left / window['width']),
+            max(0.0, top / window['height']),
+            min(1.0, right / window['width']),
+            min(1.0, bottom / window['height']),
+        )
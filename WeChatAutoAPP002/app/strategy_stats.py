@@ -0,0 +1,103 @@
+import os
+import json
+import random
+import threading
+
+# 成功率和耗时的指数滑动平均系数（越大越看重最近的结果）
+SMOOTHING = 0.2
+# 计算期望耗时时成功率的下限，避免除零
+MIN_SUCCESS_RATE = 0.05
+
+
+class StrategyStats:
+    """点击策略统计：按元素记录各策略的成功率和耗时，按期望耗时排序，并在会话间持久化
+
+    期望耗时 = 平均耗时 / 成功率；未尝试过的策略排在已知策略之后（保持默认顺序），
+    每次以 explore_rate 的概率把另一个策略提到最前面重新探测。
+    record() 只更新内存中的统计，由调用方在一批发送结束或退出时调用 flush() 写入文件。
+    """
+    def __init__(self, stats_file=None, explore_rate=0.1, rng=None):
+        self.stats_file = stats_file
+        self.explore_rate = explore_rate
+        self.rng = rng or random.Random()
+        self._stats = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def expected_cost(self, element, strategy):
+        """策略的期望耗时（秒），未尝试过时返回 None"""
+        with self._lock:
+            entry = self._stats.get(element, {}).get(strategy)
+        if not entry:
+            return None
+        return entry['latency'] / max(entry['success_rate'], MIN_SUCCESS_RATE)
+
+    def order(self, element, strategies):
+        """返回本次尝试策略的顺序"""
+        def sort_key(item):
+            index, strategy = item
+            cost = self.expected_cost(element, strategy)
+            return (cost is None, cost or 0.0, index)
+
+        ordered = [s for _, s in sorted(enumerate(strategies), key=sort_key)]
+        if len(ordered) > 1 and self.rng.random() < self.explore_rate:
+            # 重新探测：优先未尝试过的策略，否则随机挑一个较慢的策略
+            untried = [s for s in ordered[1:] if self.expected_cost(element, s) is None]
+            probe = untried[0] if untried else self.rng.choice(ordered[1:])
+            ordered.remove(probe)
+            ordered.insert(0, probe)
+        return ordered
+
+    def record(self, element, strategy, success, elapsed):
+        """记录一次策略执行结果"""
+        with self._lock:
+            entry = self._stats.setdefault(element, {}).get(strategy)
+            if entry is None:
+                entry = {'attempts': 0, 'success_rate': 1.0 if success else 0.0, 'latency': elapsed}
+            else:
+                entry['success_rate'] += SMOOTHING * ((1.0 if success else 0.0) - entry['success_rate'])
+                entry['latency'] += SMOOTHING * (elapsed - entry['latency'])
+            entry['attempts'] += 1
+            self._stats[element][strategy] = entry
+            self._dirty = True
+
+    def flush(self):
+        """有未保存的统计时写入文件"""
+        with self._lock:
+            if not self._dirty:
+                return True
+            self._dirty = False
+        if self.save():
+            return True
+        with self._lock:
+            self._dirty = True
+        return False
+
+    def load(self):
+        """从文件加载统计数据"""
+        if not self.stats_file or not os.path.exists(self.stats_file):
+            return
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+            with self._lock:
+                self._stats = stats if isinstance(stats, dict) else {}
+        except Exception as e:
+            print(f"点击策略统计加载失败: {e}")
+
+    def save(self):
+        """保存统计数据到文件（先写临时文件再替换）"""
+        if not self.stats_file:
+            return False
+        try:
+            with self._lock:
+                data = json.loads(json.dumps(self._stats))
+            tmp_file = self.stats_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_file, self.stats_file)
+            return True
+        except Exception as e:
+            print(f"点击策略统计保存失败: {e}")
+            return False
@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import hashlib
+import cv2
+import numpy as np
+from app.user_data import get_user_data_path
+
+# 紧凑模板存放的子目录名（位于 light/dark 目录下）
+COMPACT_DIR = "compact"
+# 用户数据目录下存放紧凑模板缓存的目录名
+COMPACT_CACHE_NAME = "compact_templates"
+# 整窗截图文件名，用作唯一性评估的上下文
+CONTEXT_NAME = "001.png"
+# 候选裁剪尺寸 (宽, 高)
+CROP_SIZES = ((48, 48), (64, 32), (96, 40))
+# 宽高都不超过该值的模板已经足够小，不再压缩
+MIN_COMPACT_SIDE = 64
+# 按纹理预筛选后参与唯一性评估的候选数量
+MAX_CANDIDATES = 40
+# 模板在上下文中的匹配度达到该值才认为上下文包含该模板
+CONTEXT_CONFIDENCE = 0.9
+# 裁剪在其它位置的最高得分不能超过该值（低于默认识别置信度 0.7，留出余量）
+MAX_FALSE_SCORE = 0.6
+
+
+def compact_cache_dir(template_path):
+    """模板目录对应的紧凑模板缓存目录：位于用户数据目录下，按模板目录的绝对路径区分"""
+    key = hashlib.sha1(os.path.abspath(template_path).encode("utf-8")).hexdigest()[:8]
+    return get_user_data_path(os.path.join(COMPACT_CACHE_NAME, key))
+
+
+def compact_paths(template_file, cache_dir=None):
+    """返回紧凑模板的 (图片路径, 元数据路径)
+
+    cache_dir 为空时放在模板所在目录下，否则放在 cache_dir/<light|dark>/ 下（模板目录只读时使用）。
+    """
+    folder, name = os.path.split(template_file)
+    base = os.path.splitext(name)[0]
+    if cache_dir:
+        compact_folder = os.path.join(cache_dir, os.path.basename(folder), COMPACT_DIR)
+    else:
+        compact_folder = os.path.join(folder, COMPACT_DIR)
+    return os.path.join(compact_folder, f"{base}.png"), os.path.join(compact_folder, f"{base}.json")
+
+
+def _candidates(template_gray):
+    """枚举候选裁剪区域，按纹理（灰度标准差）预筛选"""
+    tpl_h, tpl_w = template_gray.shape[:2]
+    candidates = []
+    for crop_w, crop_h in CROP_SIZES:
+        crop_w, crop_h = min(crop_w, tpl_w), min(crop_h, tpl_h)
+        step_x = max(4, (tpl_w - crop_w) // 16)
+        step_y = max(4, (tpl_h - crop_h) // 16)
+        for y in range(0, tpl_h - crop_h + 1, step_y):
+            for x in range(0, tpl_w - crop_w + 1, step_x):
+                texture = float(template_gray[y:y + crop_h, x:x + crop_w].std())
+                candidates.append((texture, (x, y, crop_w, crop_h)))
+    candidates.sort(key=lambda c: c[0], reverse=True)
+    return candidates[:MAX_CANDIDATES]
+
+
+def _false_score(crop, image, true_loc=None):
+    """裁剪在图像中除真实位置外的最高匹配得分"""
+    result = cv2.matchTemplate(image, crop, cv2.TM_CCOEFF_NORMED)
+    result = np.nan_to_num(result, nan=-1.0)
+    if true_loc is not None:
+        true_x, true_y = true_loc
+        crop_h, crop_w = crop.shape[:2]
+        result[max(0, true_y - crop_h // 2):true_y + crop_h // 2 + 1,
+               max(0, true_x - crop_w // 2):true_x + crop_w // 2 + 1] = -1
+    return float(result.max())
+
+
+def find_distinctive_crop(template_gray, context_gray=None):
+    """找出模板中最有区分度的子区域，返回 (x, y, w, h)；模板已足够小或找不到足够独特的裁剪时返回 None"""
+    tpl_h, tpl_w = template_gray.shape[:2]
+    if tpl_w <= MIN_COMPACT_SIDE and tpl_h <= MIN_COMPACT_SIDE:
+        return None
+
+    # 整窗截图包含该模板时记录其位置；不包含时整张截图都算“其它位置”
+    origin = None
+    if (context_gray is not None and context_gray.shape[0] >= tpl_h and
+            context_gray.shape[1] >= tpl_w):
+        result = cv2.matchTemplate(context_gray, template_gray, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val >= CONTEXT_CONFIDENCE:
+            origin = max_loc
+
+    # 唯一性 = 1 - 其它位置的最高得分（模板自身内部和整窗截图都要考虑）
+    best_false, best_rect = None, None
+    for texture, (x, y, w, h) in _candidates(template_gray):
+        if texture <= 0:
+            continue
+        crop = template_gray[y:y + h, x:x + w]
+        false_score = _false_score(crop, template_gray, (x, y))
+        if context_gray is not None and false_score < MAX_FALSE_SCORE:
+            true_loc = (origin[0] + x, origin[1] + y) if origin else None
+            false_score = max(false_score, _false_score(crop, context_gray, true_loc))
+        if false_score >= MAX_FALSE_SCORE:
+            continue
+        if best_false is None or false_score < best_false:
+            best_false, best_rect = false_score, (x, y, w, h)
+    return best_rect
+
+
+def compile_template(template_file, context_gray=None, cache_dir=None):
+    """生成单个模板的紧凑裁剪和元数据，返回元数据 dict
+
+    找不到合适裁剪时元数据的 crop 为 None，同样写入文件，避免每次启动重复计算。
+    无法写入时返回 None（识别时使用原模板）。
+    """
+    template_gray = cv2.imread(template_file, cv2.IMREAD_GRAYSCALE)
+    if template_gray is None:
+        return None
+    rect = find_distinctive_crop(template_gray, context_gray)
+
+    tpl_h, tpl_w = template_gray.shape[:2]
+    meta = {
+        'crop': None,
+        'source_size': [tpl_w, tpl_h],
+        'source_mtime': os.path.getmtime(template_file),
+    }
+    image_path, meta_path = compact_paths(template_file, cache_dir)
+    try:
+        os.makedirs(os.path.dirname(image_path), exist_ok=True)
+        if rect is not None:
+            x, y, w, h = rect
+            meta['crop'] = [x, y, w, h]
+            if not cv2.imwrite(image_path, template_gray[y:y + h, x:x + w]):
+                raise OSError(f"无法写入 {image_path}")
+        elif os.path.exists(image_path):
+            os.remove(image_path)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=4)
+    except OSError as e:
+        print(f"紧凑模板保存失败，使用原模板: {e}")
+        return None
+    return meta
+
+
+def load_compact(template_file, cache_dir=None):
+    """读取与模板文件匹配的紧凑模板，返回 (灰度裁剪, 元数据)
+
+    元数据不存在或已过期时返回 (None, None)；模板不需要压缩时返回 (None, 元数据)。
+    """
+    image_path, meta_path = compact_paths(template_file, cache_dir)
+    if not os.path.exists(meta_path):
+        return None, None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('source_mtime') != os.path.getmtime(template_file):
+            return None, None
+        if meta.get('crop') is None:
+            return None, meta
+        crop = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        return (crop, meta) if crop is not None else (None, None)
+    except Exception:
+        return None, None
+
+
+def compile_templates(template_path, modes=("light", "dark"), force=False, cache_dir=None):
+    """为所有模板生成紧凑裁剪，返回 {模板文件: 元数据}"""
+    compiled = {}
+    for mode in modes:
+        mode_path = os.path.join(template_path, mode)
+        if not os.path.isdir(mode_path):
+            continue
+        context = cv2.imread(os.path.join(mode_path, CONTEXT_NAME), cv2.IMREAD_GRAYSCALE)
+        for name in sorted(os.listdir(mode_path)):
+            if not name.lower().endswith(".png") or name == CONTEXT_NAME:
+                continue
+            template_file = os.path.join(mode_path, name)
+            if not force and load_compact(template_file, cache_dir)[1] is not None:
+                continue
+            meta = compile_template(template_file, context, cache_dir)
+            if meta:
+                compiled[template_file] = meta
+    return compiled
+
+
+def main():
+    template_path = sys.argv[1] if len(sys.argv) > 1 else "wechat_templates"
+    # 与程序读取的位置一致：生成到用户数据目录，不写入模板目录
+    cache_dir = compact_cache_dir(template_path)
+    compiled = compile_templates(template_path, force=True, cache_dir=cache_dir)
+    print(f"紧凑模板目录: {cache_dir}")
+    for template_file, meta in compiled.items():
+        src_w, src_h = meta['source_size']
+        if meta['crop'] is None:
+            print(f"{template_file}: {src_w}x{src_h} 保持原样（没有足够独特的子区域）")
+            continue
+        x, y, w, h = meta['crop']
+        print(f"{template_file}: {src_w}x{src_h} -> {w}x{h} @({x}, {y})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import os
+import time
+import threading
+import cv2
+from app.feature_match import compute_features
+from app.template_compiler import CONTEXT_NAME, load_compact
+
+# 与原多尺度匹配保持一致的缩放比例
+DEFAULT_SCALES = (0.7, 0.8, 0.9, 1.0, 1.1, 1.2, 1.3)
+# 缩放后宽或高小于该值的模板不参与匹配
+MIN_TEMPLATE_SIZE = 20
+
+
+class TemplateEntry:
+    """单个模板的缓存项：灰度原图 + 预缩放金字塔"""
+    def __init__(self, path, mtime, gray, scaled, crop_origin=(0, 0)):
+        self.path = path
+        self.mtime = mtime
+        self.gray = gray
+        self.scaled = scaled  # [(scale, image), ...]，使用紧凑模板时为紧凑裁剪的各尺度
+        self.crop_origin = crop_origin  # 紧凑裁剪在原模板中的左上角
+        self.features = None  # ORB (keypoints, descriptors)，首次使用时计算
+
+    def element_rect(self, x, y, scale):
+        """把匹配到的裁剪左上角换算回原元素的 (left, top, width, height)"""
+        crop_x, crop_y = self.crop_origin
+        return (x - int(round(crop_x * scale)), y - int(round(crop_y * scale)),
+                int(self.gray.shape[1] * scale), int(self.gray.shape[0] * scale))
+
+
+class TemplateStore:
+    """模板缓存：每个模板只解码一次，文件修改时间变化时自动失效"""
+    def __init__(self, template_path, scales=DEFAULT_SCALES, use_compact=False, compact_dir=None):
+        self.template_path = template_path
+        self.scales = tuple(scales)
+        self.use_compact = use_compact
+        self.compact_dir = compact_dir
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _load(self, template_file, mtime):
+        """读取灰度模板并生成各尺度缩放图"""
+        gray = cv2.imread(template_file, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            return None
+
+        # 有紧凑裁剪时用裁剪做模板匹配，原图仍用于特征匹配
+        match_gray, crop_origin = gray, (0, 0)
+        if self.use_compact:
+            crop, meta = load_compact(template_file, self.compact_dir)
+            if crop is not None:
+                match_gray, crop_origin = crop, tuple(meta['crop'][:2])
+
+        scaled = []
+        for scale in self.scales:
+            new_w = int(match_gray.shape[1] * scale)
+            new_h = int(match_gray.shape[0] * scale)
+            if new_w < MIN_TEMPLATE_SIZE or new_h < MIN_TEMPLATE_SIZE:
+                continue
+            image = match_gray if scale == 1.0 else cv2.resize(match_gray, (new_w, new_h))
+            scaled.append((scale, image))
+        return TemplateEntry(template_file, mtime, gray, scaled, crop_origin)
+
+    def get(self, template_file):
+        """获取模板缓存项，不存在或已修改时重新加载"""
+        try:
+            mtime = os.path.getmtime(template_file)
+        except OSError:
+            with self._lock:
+                self._entries.pop(template_file, None)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(template_file)
+        if entry is not None and entry.mtime == mtime:
+            return entry
+
+        entry = self._load(template_file, mtime)
+        with self._lock:
+            if entry is None:
+                self._entries.pop(template_file, None)
+            else:
+                self._entries[template_file] = entry
+        return entry
+
+    def gray(self, template_file):
+        """获取灰度模板"""
+        entry = self.get(template_file)
+        return entry.gray if entry else None
+
+    def features(self, template_file):
+        """获取模板的 ORB 关键点和描述子，每个模板只计算一次"""
+        entry = self.get(template_file)
+        if entry is None:
+            return None
+        if entry.features is None:
+            entry.features = compute_features(entry.gray)
+        return entry.features
+
+    def invalidate(self, template_file=None):
+        """清除指定模板（或全部模板）的缓存"""
+        with self._lock:
+            if template_file is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(template_file, None)
+
+    def warm_up(self, modes=("light", "dark")):
+        """预加载所有模式目录下的模板，返回 (加载数量, 耗时秒数)"""
+        start = time.perf_counter()
+        count = 0
+        for mode in modes:
+            mode_path = os.path.join(self.template_path, mode)
+            if not os.path.isdir(mode_path):
+                continue
+            for name in sorted(os.listdir(mode_path)):
+                # 整窗截图只是参考图，不参与定位
+                if not name.lower().endswith(".png") or name == CONTEXT_NAME:
+                    continue
+                if self.get(os.path.join(mode_path, name)) is not None:
+                    count += 1
+        return count, time.perf_counter() - start
@@ -0,0 +1,60 @@
+import threading
+import cv2
+
+# 亮度低于该值的像素视为“暗像素”
+DARK_PIXEL_LEVEL = 96
+# 暗像素占比超过该值判定为深色模式
+DARK_RATIO_THRESHOLD = 0.5
+# 连续定位失败多少次后重新检测主题
+DEFAULT_FAILURE_LIMIT = 2
+
+
+def classify_theme(gray):
+    """根据亮度直方图判断浅色/深色模式，返回 "light" 或 "dark"，无法判断时返回 None"""
+    if gray is None or gray.size == 0:
+        return None
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+    total = hist.sum()
+    if total <= 0:
+        return None
+    dark_ratio = hist[:DARK_PIXEL_LEVEL].sum() / total
+    return "dark" if dark_ratio > DARK_RATIO_THRESHOLD else "light"
+
+
+class ThemeDetector:
+    """微信主题检测：检测一次后在会话内缓存，连续定位失败时才重新检测"""
+    def __init__(self, failure_limit=DEFAULT_FAILURE_LIMIT):
+        self.failure_limit = failure_limit
+        self.theme = None
+        self._failures = 0
+        self._lock = threading.Lock()
+
+    def current(self, window_gray_provider):
+        """返回缓存的主题；未检测过时调用 window_gray_provider() 取窗口灰度图检测"""
+        with self._lock:
+            if self.theme is not None:
+                return self.theme
+        theme = classify_theme(window_gray_provider())
+        with self._lock:
+            self.theme = theme
+            self._failures = 0
+        return theme
+
+    def report(self, success):
+        """报告一次定位结果，返回是否需要重新检测主题"""
+        with self._lock:
+            if success:
+                self._failures = 0
+                return False
+            self._failures += 1
+            if self._failures >= self.failure_limit:
+                self.theme = None
+                self._failures = 0
+                return True
+            return False
+
+    def reset(self):
+        """清除缓存的主题"""
+        with self._lock:
+            self.theme = None
+            self._failures = 0
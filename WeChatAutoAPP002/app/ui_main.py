@@ -2,9 +2,9 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                            QTabWidget, QLabel, QLineEdit, QTextEdit, QPushButton,
                            QGroupBox, QProgressBar, QSplitter, QFormLayout,
                            QDoubleSpinBox, QCheckBox, QSpinBox, QFileDialog, 
-                           QScrollArea
+                           QScrollArea, QComboBox, QDateTimeEdit
                            )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QDateTime
 from PyQt5.QtGui import QFont, QPalette, QColor
 
 class MainWindow(QMainWindow):
@@ -150,6 +150,12 @@ class MainWindow(QMainWindow):
         """)
         left_layout.addWidget(self.send_single_btn)
         
+        # 定时发送：加入发送队列，由后台调度线程按时发送
+        self.schedule_time, self.job_priority = self._add_schedule_group(left_layout)
+        self.enqueue_single_btn = QPushButton("加入定时队列")
+        self.enqueue_single_btn.setMinimumHeight(40)
+        left_layout.addWidget(self.enqueue_single_btn)
+        
         # 右侧面板 - 日志
         right_panel = QWidget()
         right_layout = QVBoxLayout(right_panel)
@@ -196,6 +202,20 @@ class MainWindow(QMainWindow):
         friends_file_group.setLayout(friends_file_layout)
         left_layout.addWidget(friends_file_group)
         
+        # 批次：新建批次，或续发上次中断的批次（跳过已发送的好友）
+        batch_mode_group = QGroupBox("发送批次")
+        batch_mode_layout = QVBoxLayout()
+        self.batch_mode = QComboBox()
+        self.batch_mode.addItem("新批次（给名单中所有好友发送）", "new")
+        self.batch_mode.addItem("续发上次批次（跳过已发送的好友）", "resume")
+        batch_mode_layout.addWidget(self.batch_mode)
+        self.last_batch_info = QLabel("暂无批量发送记录")
+        self.last_batch_info.setStyleSheet("color: #7f8c8d; font-style: italic;")
+        self.last_batch_info.setWordWrap(True)
+        batch_mode_layout.addWidget(self.last_batch_info)
+        batch_mode_group.setLayout(batch_mode_layout)
+        left_layout.addWidget(batch_mode_group)
+        
         # 消息编辑
         msg_group = QGroupBox("消息内容")
         msg_layout = QVBoxLayout()
@@ -215,6 +235,12 @@ class MainWindow(QMainWindow):
         """)
         left_layout.addWidget(self.send_batch_btn)
         
+        # 定时发送：为好友文件中的每位好友加入一个定时任务
+        self.batch_schedule_time, self.batch_job_priority = self._add_schedule_group(left_layout)
+        self.enqueue_batch_btn = QPushButton("批量加入定时队列")
+        self.enqueue_batch_btn.setMinimumHeight(40)
+        left_layout.addWidget(self.enqueue_batch_btn)
+        
         # 右侧面板 - 日志
         right_panel = QWidget()
         right_layout = QVBoxLayout(right_panel)
@@ -243,6 +269,21 @@ class MainWindow(QMainWindow):
         
         layout.addWidget(splitter)
     
+    def _add_schedule_group(self, parent_layout):
+        """定时发送设置（发送时间、优先级），返回两个控件"""
+        schedule_group = QGroupBox("定时发送")
+        schedule_layout = QFormLayout()
+        schedule_time = QDateTimeEdit(QDateTime.currentDateTime())
+        schedule_time.setDisplayFormat("yyyy-MM-dd HH:mm")
+        schedule_time.setCalendarPopup(True)
+        schedule_layout.addRow("发送时间:", schedule_time)
+        priority = QSpinBox()
+        priority.setRange(0, 9)
+        schedule_layout.addRow("优先级:", priority)
+        schedule_group.setLayout(schedule_layout)
+        parent_layout.addWidget(schedule_group)
+        return schedule_time, priority
+    
     def init_settings_tab(self):
         layout = QVBoxLayout(self.tab_settings)
         layout.setContentsMargins(20, 20, 20, 20)
@@ -289,6 +330,31 @@ class MainWindow(QMainWindow):
         self.pyautogui_pause.setSingleStep(0.1)
         settings_layout.addRow("操作延迟(秒):", self.pyautogui_pause)
         
+        # 输入速度档位（稳妥档沿用上面的操作延迟）
+        self.input_profile = QComboBox()
+        self.input_profile.addItem("稳妥（平滑移动，使用操作延迟）", "safe")
+        self.input_profile.addItem("标准", "normal")
+        self.input_profile.addItem("快速（瞬移点击）", "fast")
+        settings_layout.addRow("输入速度:", self.input_profile)
+        
+        # 批量发送节奏
+        self.pacing_rate_per_min = QSpinBox()
+        self.pacing_rate_per_min.setRange(1, 120)
+        settings_layout.addRow("发送速度(条/分钟):", self.pacing_rate_per_min)
+        
+        self.pacing_burst = QSpinBox()
+        self.pacing_burst.setRange(1, 20)
+        settings_layout.addRow("连续发送上限(条):", self.pacing_burst)
+        
+        self.pacing_jitter = QDoubleSpinBox()
+        self.pacing_jitter.setRange(0.0, 1.0)
+        self.pacing_jitter.setSingleStep(0.1)
+        settings_layout.addRow("随机间隔比例:", self.pacing_jitter)
+        
+        self.pacing_quiet_hours = QLineEdit()
+        self.pacing_quiet_hours.setPlaceholderText("如 22:00-08:00，留空表示不限制")
+        settings_layout.addRow("免打扰时段:", self.pacing_quiet_hours)
+        
         self.use_hybrid_mode = QCheckBox()
         self.use_hybrid_mode.setChecked(True)
         settings_layout.addRow("使用混合模式:", self.use_hybrid_mode)
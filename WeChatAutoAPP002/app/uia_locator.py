@@ -0,0 +1,141 @@
+import time
+import threading
+from collections import deque
+
+# 各元素在 UIA 控件树中的特征：依次尝试，control_type 必须一致，title 为空表示不限
+DEFAULT_CONTROL_SPECS = {
+    "search_icon": [{"control_type": "Edit", "title": "搜索"}],
+    "message_input": [{"control_type": "Edit", "title": "输入"}],
+    "send_button": [{"control_type": "Button", "title": "发送(S)"}, {"control_type": "Button", "title": "发送"}],
+}
+# 控件树搜索的最大深度（微信主窗口的控件层级不深，限制深度避免遍历过久）
+MAX_SEARCH_DEPTH = 12
+# 找不到的元素在这段时间（秒）内不再重复遍历控件树（聊天打开后输入框才会出现，所以不能永久记住）
+MISSING_TTL = 30.0
+
+
+def control_matches(control, spec):
+    """控件是否符合特征（控件失效时返回 False）"""
+    try:
+        if control.element_info.control_type != spec["control_type"]:
+            return False
+        if spec["title"] and control.window_text() != spec["title"]:
+            return False
+        return control.is_visible()
+    except Exception:
+        return False
+
+
+def control_rect(control):
+    """控件的屏幕位置 (left, top, width, height)，尺寸为 0 时返回 None"""
+    rect = control.rectangle()
+    width, height = rect.right - rect.left, rect.bottom - rect.top
+    if width <= 0 or height <= 0:
+        return None
+    return rect.left, rect.top, width, height
+
+
+class UIALocator:
+    """UIA 控件树定位：首次按特征搜索控件树，之后按缓存的控件和路径直接访问
+
+    缓存按根窗口句柄区分，微信重新连接后自动失效；找不到的元素在 missing_ttl 秒内不再重复遍历。
+    """
+    def __init__(self, specs=None, max_depth=MAX_SEARCH_DEPTH, missing_ttl=MISSING_TTL, clock=time.monotonic):
+        self.specs = dict(DEFAULT_CONTROL_SPECS)
+        if specs:
+            self.specs.update(specs)
+        self.max_depth = max_depth
+        self.missing_ttl = missing_ttl
+        self.clock = clock
+        self._root_handle = None
+        self._controls = {}  # 元素 -> (控件, 子控件下标路径, 特征)
+        self._missing = {}   # 元素 -> 上次搜索失败的时间
+        self.search_count = 0  # 完整遍历控件树的次数，便于统计
+        self._lock = threading.Lock()
+
+    def _reset_for_root(self, root):
+        handle = getattr(root, "handle", None)
+        if handle != self._root_handle:
+            self._root_handle = handle
+            self._controls = {}
+            self._missing = {}
+
+    def _follow_path(self, root, path):
+        """按子控件下标路径直接访问控件"""
+        control = root
+        for index in path:
+            children = control.children()
+            if index >= len(children):
+                return None
+            control = children[index]
+        return control
+
+    def _search(self, root, specs):
+        """广度优先搜索控件树，返回 (控件, 路径, 特征) 或 None"""
+        self.search_count += 1
+        for spec in specs:
+            queue = deque([(root, ())])
+            while queue:
+                control, path = queue.popleft()
+                if path and control_matches(control, spec):
+                    return control, path, spec
+                if len(path) >= self.max_depth:
+                    continue
+                try:
+                    children = control.children()
+                except Exception:
+                    continue
+                for index, child in enumerate(children):
+                    queue.append((child, path + (index,)))
+        return None
+
+    def resolve(self, element, root):
+        """返回元素对应的控件，找不到时返回 None"""
+        specs = self.specs.get(element)
+        if not specs or root is None:
+            return None
+        with self._lock:
+            self._reset_for_root(root)
+            cached = self._controls.get(element)
+            if cached:
+                control, path, spec = cached
+                # 1. 缓存的控件仍然有效
+                if control_matches(control, spec):
+                    return control
+                # 2. 控件被重建，但树结构没变
+                try:
+                    control = self._follow_path(root, path)
+                except Exception:
+                    control = None
+                if control is not None and control_matches(control, spec):
+                    self._controls[element] = (control, path, spec)
+                    return control
+                del self._controls[element]
+            elif self.clock() - self._missing.get(element, float("-inf")) < self.missing_ttl:
+                return None
+
+            # 3. 完整搜索控件树
+            found = self._search(root, specs)
+            if found is None:
+                self._missing[element] = self.clock()
+                return None
+            self._missing.pop(element, None)
+            self._controls[element] = found
+            return found[0]
+
+    def locate(self, element, root):
+        """返回元素的屏幕位置 (left, top, width, height)，找不到时返回 None"""
+        control = self.resolve(element, root)
+        if control is None:
+            return None
+        try:
+            return control_rect(control)
+        except Exception:
+            return None
+
+    def invalidate(self):
+        """清除所有缓存"""
+        with self._lock:
+            self._root_handle = None
+            self._controls = {}
+            self._missing = {}
@@ -0,0 +1,19 @@
+import os
+
+APP_DATA_NAME = "WeChatAutoAPP"
+
+
+def get_user_data_path(relative_path):
+    """获取用户可写的数据文件路径（安装目录可能只读，日志、统计、缓存等写到用户数据目录）"""
+    if os.name == "nt":
+        base_path = os.environ.get("LOCALAPPDATA") or os.environ.get("APPDATA") or os.path.expanduser("~")
+    else:
+        base_path = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    data_path = os.path.join(base_path, APP_DATA_NAME, relative_path)
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    return data_path
+
+
+def resolve_data_path(path):
+    """配置中的数据文件路径：绝对路径原样使用，相对路径放到用户数据目录下"""
+    return path if os.path.isabs(path) else get_user_data_path(path)
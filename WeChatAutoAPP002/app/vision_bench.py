@@ -0,0 +1,230 @@
+"""离线视觉基准测试
+
+在存储的截图（wechat_templates/*/001.png 整窗截图）及其合成变体
+（不同分辨率、DPI 缩放、窗口位置、主题）上运行定位流程，
+对每种策略统计延迟分位数、命中率和定位误差。
+各策略调用程序使用的 ImageLocator（pipeline 为完整定位流程，其余为其中的单个匹配器），
+截屏换成文件回放后端，无需显示器即可在 Linux 上运行：
+
+    python -m app.vision_bench [模板目录] [--repeat N]
+"""
+import os
+import sys
+import time
+import argparse
+import cv2
+import numpy as np
+
+from app.template_store import TemplateStore
+from app.template_compiler import compile_templates, compact_cache_dir
+from app.frame_capture import FrameGrabber
+from app.capture_backends import FrameSequenceBackend
+from app.image_locator import ImageLocator
+from app.pyramid_match import exhaustive_match
+
+ELEMENTS = ("search_icon", "message_input", "send_button")
+# 合成变体参数
+SCREEN_SIZES = ((1920, 1080), (2560, 1440), (3840, 2160))
+DPI_SCALES = (0.8, 1.0, 1.25)
+WINDOW_POSITIONS = ((0.05, 0.05), (0.4, 0.2))
+# 认定真实位置所需的最低置信度
+TRUTH_CONFIDENCE = 0.95
+# 中心点误差不超过该像素数视为命中
+HIT_TOLERANCE = 8
+# 与 WeChatAuto 默认配置一致的匹配阈值、并行线程数和提前结束阈值
+CONFIDENCE = 0.7
+LOCATE_WORKERS = 4
+EARLY_STOP_CONFIDENCE = 0.95
+
+
+class BenchSample:
+    """一帧测试数据：RGB 画面、主题、微信窗口位置和各元素真实位置 {元素: (x, y, w, h)}"""
+    def __init__(self, name, rgb, theme, window, truth):
+        self.name = name
+        self.rgb = rgb
+        self.theme = theme
+        self.window = window
+        self.truth = truth
+
+
+def _window_truth(window_gray, template_path, theme):
+    """在整窗截图中用 1.0 尺度穷举匹配确定各元素真实位置"""
+    truth = {}
+    for element in ELEMENTS:
+        template = cv2.imread(os.path.join(template_path, theme, f"{element}.png"), cv2.IMREAD_GRAYSCALE)
+        if template is None or template.shape[0] > window_gray.shape[0] or template.shape[1] > window_gray.shape[1]:
+            continue
+        val, (x, y) = exhaustive_match(window_gray, template)
+        if val >= TRUTH_CONFIDENCE:
+            truth[element] = (x, y, template.shape[1], template.shape[0])
+    return truth
+
+
+def build_corpus(template_path):
+    """构建测试语料：原始整窗截图 + 合成变体"""
+    corpus = []
+    for theme in ("light", "dark"):
+        window_bgr = cv2.imread(os.path.join(template_path, theme, "001.png"), cv2.IMREAD_COLOR)
+        if window_bgr is None:
+            continue
+        window_rgb = cv2.cvtColor(window_bgr, cv2.COLOR_BGR2RGB)
+        truth = _window_truth(cv2.cvtColor(window_rgb, cv2.COLOR_RGB2GRAY), template_path, theme)
+        if not truth:
+            continue
+        window = {'left': 0, 'top': 0, 'width': window_rgb.shape[1], 'height': window_rgb.shape[0]}
+        corpus.append(BenchSample(f"{theme}/001", window_rgb, theme, window, truth))
+
+        # 桌面背景取主题相反的亮度，避免窗口边缘与背景融为一体
+        background = 40 if theme == "light" else 200
+        for screen_w, screen_h in SCREEN_SIZES:
+            for dpi in DPI_SCALES:
+                scaled = window_rgb if dpi == 1.0 else cv2.resize(
+                    window_rgb, None, fx=dpi, fy=dpi, interpolation=cv2.INTER_LINEAR)
+                win_h, win_w = scaled.shape[:2]
+                if win_w > screen_w or win_h > screen_h:
+                    continue
+                for rel_x, rel_y in WINDOW_POSITIONS:
+                    left = int((screen_w - win_w) * rel_x)
+                    top = int((screen_h - win_h) * rel_y)
+                    screen = np.full((screen_h, screen_w, 3), background, dtype=np.uint8)
+                    screen[top:top + win_h, left:left + win_w] = scaled
+                    sample_truth = {
+                        element: (left + int(x * dpi), top + int(y * dpi), int(w * dpi), int(h * dpi))
+                        for element, (x, y, w, h) in truth.items()
+                    }
+                    name = f"{theme}/{screen_w}x{screen_h}@{dpi}+{left},{top}"
+                    window = {'left': left, 'top': top, 'width': win_w, 'height': win_h}
+                    corpus.append(BenchSample(name, screen, theme, window, sample_truth))
+    return corpus
+
+
+def strategy_pipeline(locator, element, template_file, frame):
+    """完整定位流程（位置备忘、区域规划、主题检测、并行匹配、尺度校准），缓存状态在样本间保留"""
+    return locator.locate(element, CONFIDENCE, frame)
+
+
+def strategy_multi_scale(locator, element, template_file, frame):
+    """在整帧上做多尺度模板匹配"""
+    return locator.multi_scale_template_match(template_file, CONFIDENCE, frame=frame)
+
+
+def strategy_feature(locator, element, template_file, frame):
+    """在整帧上做 ORB 特征匹配"""
+    return locator.feature_based_match(template_file, frame=frame)
+
+
+def _load_pyscreeze():
+    """pyautogui.locateOnScreen 的底层实现，未安装时返回 None"""
+    try:
+        import pyscreeze
+        from PIL import Image
+        return pyscreeze, Image
+    except ImportError:
+        return None
+
+
+def strategy_locate_on_screen(locator, element, template_file, frame):
+    """与 pyautogui.locateOnScreen(grayscale=True, confidence=...) 相同的匹配"""
+    pyscreeze, Image = _load_pyscreeze()
+    haystack = frame.cached("pil", lambda: Image.fromarray(frame.rgb))
+    try:
+        box = pyscreeze.locate(template_file, haystack, grayscale=True, confidence=CONFIDENCE)
+    except pyscreeze.ImageNotFoundException:
+        return None
+    return box
+
+
+# 策略名 -> (策略函数, ImageLocator 参数)
+STRATEGIES = {
+    "pipeline": (strategy_pipeline, {}),
+    "multi_scale": (strategy_multi_scale, {"use_pyramid": False}),
+    "multi_scale_pyramid": (strategy_multi_scale, {"use_pyramid": True}),
+    "feature": (strategy_feature, {}),
+    "locate_on_screen": (strategy_locate_on_screen, {}),
+}
+
+
+def percentile(values, q):
+    """计算分位数，空列表返回 0"""
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def run_benchmark(template_path, strategies=None, repeat=1, use_compact=False):
+    """运行基准测试，返回 {策略名: 统计结果}"""
+    strategies = strategies or list(STRATEGIES)
+    if "locate_on_screen" in strategies and _load_pyscreeze() is None:
+        print("未安装 pyscreeze，跳过 locate_on_screen 策略")
+        strategies = [s for s in strategies if s != "locate_on_screen"]
+
+    # 紧凑模板使用与程序相同的缓存目录
+    cache_dir = compact_cache_dir(template_path) if use_compact else None
+    if use_compact:
+        compile_templates(template_path, cache_dir=cache_dir)
+    store = TemplateStore(template_path, use_compact=use_compact, compact_dir=cache_dir)
+    store.warm_up()
+    screen = FrameSequenceBackend()
+    grabber = FrameGrabber(ttl=0, backend=screen)
+    corpus = build_corpus(template_path)
+
+    report = {}
+    for name in strategies:
+        strategy, options = STRATEGIES[name]
+        current = {}
+        # 每个策略使用新的定位流程实例，位置备忘等缓存不在策略间共享
+        locator = ImageLocator(template_path, store, grabber,
+                               window_provider=lambda: current.get('window'),
+                               locate_workers=LOCATE_WORKERS,
+                               early_stop_confidence=EARLY_STOP_CONFIDENCE,
+                               on_status=lambda message: None,
+                               **options)
+        latencies, errors = [], []
+        hits = total = 0
+        for sample in corpus:
+            screen.show(sample.rgb)
+            current['window'] = sample.window
+            for element, (tx, ty, tw, th) in sample.truth.items():
+                template_file = os.path.join(template_path, sample.theme, f"{element}.png")
+                for _ in range(repeat):
+                    # 每次都重新取帧，灰度转换和特征计算计入耗时
+                    frame = grabber.grab(force=True)
+                    start = time.perf_counter()
+                    match = strategy(locator, element, template_file, frame)
+                    latencies.append(time.perf_counter() - start)
+                    total += 1
+                    if match is None:
+                        continue
+                    x, y, w, h = match.left, match.top, match.width, match.height
+                    error = float(np.hypot((x + w / 2) - (tx + tw / 2), (y + h / 2) - (ty + th / 2)))
+                    errors.append(error)
+                    if error <= HIT_TOLERANCE:
+                        hits += 1
+        report[name] = {
+            'samples': total,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p90_ms': percentile(latencies, 90) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'hit_rate': hits / total if total else 0.0,
+            'mean_error_px': float(np.mean(errors)) if errors else 0.0,
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="微信界面定位离线基准测试")
+    parser.add_argument("template_path", nargs="?", default="wechat_templates")
+    parser.add_argument("--repeat", type=int, default=1, help="每个样本重复次数")
+    parser.add_argument("--strategy", action="append", choices=list(STRATEGIES),
+                        help="只运行指定策略（可重复）")
+    parser.add_argument("--compact", action="store_true", help="使用紧凑模板（必要时先生成）")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.template_path, args.strategy, args.repeat, args.compact)
+    print(f"{'策略':<22}{'样本':>6}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'命中率':>9}{'误差(px)':>10}")
+    for name, stats in report.items():
+        print(f"{name:<22}{stats['samples']:>6}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}"
+              f"{stats['p99_ms']:>10.1f}{stats['hit_rate']:>9.1%}{stats['mean_error_px']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import time
+import cv2
+import numpy as np
+
+# 界面签名的边长（缩小后比较，对噪声不敏感且足够快）
+SIGNATURE_SIZE = 64
+# 签名平均差超过该值视为界面发生了变化
+CHANGE_THRESHOLD = 2.0
+
+
+def frame_signature(gray):
+    """把灰度图缩小为固定大小的签名，用于快速判断界面是否变化"""
+    if gray is None or gray.size == 0:
+        return None
+    small = cv2.resize(gray, (SIGNATURE_SIZE, SIGNATURE_SIZE), interpolation=cv2.INTER_AREA)
+    return small.astype(np.int16)
+
+
+def signatures_differ(a, b, threshold=CHANGE_THRESHOLD):
+    """两个签名是否有明显差异"""
+    if a is None or b is None:
+        return a is not b
+    return float(np.mean(np.abs(a - b))) > threshold
+
+
+class WaitEngine:
+    """事件驱动等待：短间隔轮询条件，满足即返回，间隔按退避系数逐步放大，超时放弃"""
+    def __init__(self, timeout=3.0, interval=0.05, backoff=1.5, max_interval=0.3,
+                 sleep=time.sleep, clock=time.monotonic):
+        self.timeout = timeout
+        self.interval = interval
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.sleep = sleep
+        self.clock = clock
+
+    def until(self, predicate, timeout=None, description=""):
+        """轮询 predicate() 直到返回真值或超时，返回是否成功"""
+        timeout = self.timeout if timeout is None else timeout
+        start = self.clock()
+        deadline = start + timeout
+        interval = self.interval
+        while True:
+            try:
+                ok = bool(predicate())
+            except Exception:
+                ok = False
+            now = self.clock()
+            if ok or now >= deadline:
+                return ok
+            self.sleep(min(interval, max(0.0, deadline - now)))
+            interval = min(interval * self.backoff, self.max_interval)
+
+    def until_stable(self, sample, timeout=None, description=""):
+        """等待连续两次采样的签名一致（界面不再变化）"""
+        state = {'last': None}
+
+        def stable():
+            current = sample()
+            last, state['last'] = state['last'], current
+            return last is not None and not signatures_differ(current, last)
+
+        return self.until(stable, timeout, description)
+
+    def until_changed(self, sample, baseline, timeout=None, description=""):
+        """等待界面相对 baseline 发生变化并稳定下来"""
+        state = {'last': None}
+
+        def changed_and_stable():
+            current = sample()
+            last, state['last'] = state['last'], current
+            if not signatures_differ(current, baseline):
+                return False
+            return last is not None and not signatures_differ(current, last)
+
+        return self.until(changed_and_stable, timeout, description)
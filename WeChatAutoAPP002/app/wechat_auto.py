@@ -5,15 +5,31 @@ import sys
 import os
 import json
 from PIL import Image
-import pyperclip
 import importlib.util
+import itertools
+import functools
+import threading
 import psutil
-from pywinauto import Application
 from pywinauto.findwindows import ElementNotFoundError
-import cv2
-import numpy as np
 # 在WeChatAuto类中添加信号支持
 from PyQt5.QtCore import QObject, pyqtSignal
+from app.template_store import TemplateStore
+from app.template_compiler import compile_templates, compact_cache_dir
+from app.user_data import get_user_data_path, resolve_data_path
+from app.frame_capture import FrameGrabber
+from app.capture_backends import create_capture_backend
+from app.element_memo import ElementPositionMemo
+from app.image_locator import ImageLocator
+from app.wait_engine import WaitEngine, frame_signature
+from app.strategy_stats import StrategyStats
+from app.wechat_session import WeChatSession, SESSION_READY, SESSION_CONNECTED
+from app.uia_locator import UIALocator
+from app.window_tracker import WindowTracker
+from app.input_driver import InputController, make_profile
+from app.pacing import PacingController
+from app.recipients import iter_recipients_file, IngestStats
+from app.batch_journal import (BatchJournal, DONE_STATES,
+                               STATE_SEARCHING, STATE_SENDING, STATE_SENT, STATE_FAILED)
 
 # 配置文件路径
 # CONFIG_FILE = "wechat_config.json"
@@ -38,7 +54,32 @@ DEFAULT_CONFIG = {
     "use_hybrid_mode": True,
     "auto_login_wait_time": 5,
     "retry_times": 2,
-    "confidence": 0.7
+    "confidence": 0.7,
+    "frame_ttl": 0.2,
+    "element_memo_file": get_user_data_path("element_memo.json"),
+    "use_pyramid_match": True,
+    "locate_workers": 4,
+    "early_stop_confidence": 0.95,
+    "wait_timeout": 3.0,
+    "wait_interval": 0.05,
+    "wait_backoff": 1.5,
+    "wait_max_interval": 0.3,
+    "use_compact_templates": True,
+    "capture_backend": "pyautogui",
+    "capture_files": [],
+    "frame_buffer_limit_mb": 256,
+    "strategy_stats_file": get_user_data_path("strategy_stats.json"),
+    "strategy_explore_rate": 0.1,
+    "use_uia_locator": True,
+    "input_profile": "safe",
+    "batch_journal_file": get_user_data_path("batch_journal.db"),
+    "pacing_rate_per_min": 20,
+    "pacing_burst": 3,
+    "pacing_jitter": 0.3,
+    "pacing_quiet_hours": "",
+    "pacing_failure_threshold": 0.5,
+    "job_queue_file": get_user_data_path("job_queue.db"),
+    "job_max_attempts": 3
 }
 
 class ConfigManager:
@@ -75,10 +116,21 @@ class ConfigManager:
             return False
 
 
+def exclusive_send(method):
+    """同一时间只允许一个发送流程操作微信（界面发送、批量发送和定时任务可能在不同线程、不同实例）"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.send_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class WeChatAuto(QObject):
     status_updated = pyqtSignal(str)  # 状态更新信号
     progress_updated = pyqtSignal(int)  # 添加进度更新信号
-    def __init__(self, config=None):
+    # 发送锁由所有实例共用：保存设置会重建实例，旧实例上的批量发送可能仍在进行
+    send_lock = threading.RLock()
+    def __init__(self, config=None, journal=None):
         # 加载配置
         super().__init__()
         self.config = config or ConfigManager.load_config()
@@ -88,14 +140,73 @@ class WeChatAuto(QObject):
         # 初始化配置
         self.use_hybrid_mode = self.config["use_hybrid_mode"]
         self.window_coordinates = {}  # 存储窗口坐标信息
+        # 窗口几何跟踪：句柄只查找一次，之后按句柄刷新；窗口移动时通知各位置缓存
+        self.window_tracker = WindowTracker()
+        self.window_tracker.add_listener(self._on_window_geometry_changed)
+        self._chat_elements = None  # 验证聊天窗口时批量定位到的元素，供发送消息复用
         self.status_callback = None  # 状态回调函数，用于UI反馈
         
         self.create_template_dir()
         # 检查必要的库是否安装
         self.check_dependencies()
-        # 配置pyautogui
-        pyautogui.PAUSE = self.config["pyautogui_pause"]  # 每个操作后的暂停时间
-        pyautogui.FAILSAFE = True  # 启用安全模式
+        # 预加载模板缓存，避免每次定位重复解码和缩放
+        # 紧凑模板生成到用户数据目录（安装目录可能只读），按模板目录区分
+        self.compact_dir = compact_cache_dir(self.template_path)
+        self.template_store = TemplateStore(self.template_path,
+                                            use_compact=self.config["use_compact_templates"],
+                                            compact_dir=self.compact_dir)
+        self.warm_up_templates()
+        # 截屏后端：pyautogui 全屏 / window 只截微信窗口 / file 回放截图文件
+        self.capture_backend = create_capture_backend(
+            self.config["capture_backend"],
+            region_provider=self._window_region,
+            files=self.config["capture_files"]
+        )
+        # 同一定位周期内共享截图帧
+        self.frame_grabber = FrameGrabber(
+            ttl=self.config["frame_ttl"],
+            backend=self.capture_backend,
+            max_buffer_bytes=self.config["frame_buffer_limit_mb"] * 1024 * 1024
+        )
+        # 图像识别定位流程（区域规划、位置备忘、主题检测、并行匹配、尺度校准），离线基准测试使用同一流程
+        self.image_locator = ImageLocator(
+            self.template_path, self.template_store, self.frame_grabber,
+            window_provider=lambda: self.window_coordinates,
+            position_memo=ElementPositionMemo(resolve_data_path(self.config["element_memo_file"])),
+            locate_workers=self.config["locate_workers"],
+            use_pyramid=self.config["use_pyramid_match"],
+            early_stop_confidence=self.config["early_stop_confidence"],
+            on_status=self._update_status
+        )
+        # 微信 UIA 会话：只连接一次，窗口句柄失效时才重新连接
+        self.session = WeChatSession()
+        # UIA 控件树定位：控件路径缓存后直接访问，图像识别作为后备
+        self.uia_locator = UIALocator()
+        # 点击策略统计：按历史成功率和耗时决定混合点击先尝试哪种方式
+        self.strategy_stats = StrategyStats(resolve_data_path(self.config["strategy_stats_file"]),
+                                            explore_rate=self.config["strategy_explore_rate"])
+        # 事件驱动等待：界面就绪即继续，替代固定 sleep
+        self.waits = WaitEngine(
+            timeout=self.config["wait_timeout"],
+            interval=self.config["wait_interval"],
+            backoff=self.config["wait_backoff"],
+            max_interval=self.config["wait_max_interval"]
+        )
+        # 输入层：按速度档位控制鼠标移动和每类操作后的等待（替代 pyautogui 的全局暂停）
+        self.input = InputController(profile=make_profile(self.config["input_profile"],
+                                                          self.config["pyautogui_pause"]))
+        self.last_send_timing = None  # 最近一次发送的耗时分解
+        # 批量发送日志：记录每位好友的发送状态，崩溃后续发且不重复发送
+        # 重建实例时传入旧实例的日志共用同一个数据库连接（旧实例上的批量发送可能仍在写入）
+        self.journal = journal or BatchJournal(resolve_data_path(self.config["batch_journal_file"]))
+        # 发送节奏：令牌桶控制持续速度和突发数量，失败激增时自动降速
+        self.pacer = PacingController(
+            rate_per_min=self.config["pacing_rate_per_min"],
+            burst=self.config["pacing_burst"],
+            jitter=self.config["pacing_jitter"],
+            quiet_hours=self.config["pacing_quiet_hours"],
+            failure_threshold=self.config["pacing_failure_threshold"]
+        )
 
     def set_status_callback(self, callback):
         """设置状态回调函数，用于向UI反馈进度"""
@@ -146,26 +257,40 @@ class WeChatAuto(QObject):
             
             self._update_status("请将浅色模式界面元素图片放入light子目录，深色模式放入dark子目录")
     
+    def warm_up_templates(self):
+        """预加载全部模板并报告耗时"""
+        if self.config["use_compact_templates"]:
+            # 首次运行或模板更新后生成紧凑裁剪，之后直接读取
+            start = time.perf_counter()
+            compiled = compile_templates(self.template_path, cache_dir=self.compact_dir)
+            if compiled:
+                self._update_status(f"已生成 {len(compiled)} 个紧凑模板，耗时 {time.perf_counter() - start:.1f} 秒")
+        count, elapsed = self.template_store.warm_up()
+        self._update_status(f"模板预加载完成: {count} 个模板，耗时 {elapsed * 1000:.1f} ms")
+        return count
+
     def get_wechat_window_info(self):
-        """获取微信窗口信息"""
+        """获取微信窗口信息（按缓存的窗口句柄刷新，不再枚举所有顶层窗口）"""
         try:
-            wechat_windows = gw.getWindowsWithTitle('微信')
-            if wechat_windows:
-                win = wechat_windows[0]
-                self.window_coordinates = {
-                    'left': win.left,
-                    'top': win.top,
-                    'width': win.width,
-                    'height': win.height,
-                    'right': win.left + win.width,
-                    'bottom': win.top + win.height
-                }
+            geometry = self.window_tracker.refresh()
+            if geometry:
+                self.window_coordinates = geometry
                 return True
             return False
         except Exception as e:
             self._update_status(f"获取窗口信息失败: {e}")
             return False
     
+    def _on_window_geometry_changed(self, old, new):
+        """窗口移动或缩放后更新依赖窗口位置的缓存"""
+        self._update_status(f"微信窗口位置变化: ({old['left']}, {old['top']}, {old['width']}x{old['height']}) -> "
+                            f"({new['left']}, {new['top']}, {new['width']}x{new['height']})")
+        self.window_coordinates = new
+        self.frame_grabber.invalidate()
+        self._chat_elements = None
+        # 只是移动（大小不变）时元素相对窗口的位置不变，备忘记录随窗口平移
+        self.image_locator.position_memo.relocate(old, new)
+    
     def click_relative_position(self, rel_x, rel_y, description=""):
         """点击相对窗口位置"""
         if not self.window_coordinates:
@@ -176,10 +301,35 @@ class WeChatAuto(QObject):
         abs_y = self.window_coordinates['top'] + int(self.window_coordinates['height'] * rel_y)
         
         self._update_status(f"点击 {description}: 相对位置({rel_x:.2f}, {rel_y:.2f}) -> 绝对位置({abs_x}, {abs_y})")
-        pyautogui.moveTo(abs_x, abs_y, duration=0.3)
-        pyautogui.click()
-        time.sleep(0.5)
+        self.input.click(abs_x, abs_y)
+        self.frame_grabber.invalidate()
+        self.wait_ui_settled(0.5, f"点击{description}后界面稳定")
         return True
+    
+    def _window_region(self):
+        """微信窗口的 (left, top, width, height)，窗口信息未知时返回 None"""
+        return self.image_locator.window_region()
+    
+    def window_signature(self):
+        """重新截屏并计算微信窗口区域的界面签名"""
+        frame = self.frame_grabber.grab(force=True)
+        return frame_signature(self.image_locator.frame_region(frame, self._window_region())[0])
+    
+    def wait_ui_settled(self, timeout=None, description=""):
+        """等待微信窗口不再变化"""
+        start = time.perf_counter()
+        ok = self.waits.until_stable(self.window_signature, timeout, description)
+        self.input.record_wait(time.perf_counter() - start)
+        return ok
+    
+    def wait_ui_changed(self, baseline, timeout=None, description=""):
+        """等待微信窗口相对 baseline 发生变化并稳定"""
+        start = time.perf_counter()
+        ok = self.waits.until_changed(self.window_signature, baseline, timeout, description)
+        self.input.record_wait(time.perf_counter() - start)
+        if not ok:
+            self._update_status(f"等待超时: {description}")
+        return ok
             
     def take_screenshot(self, region_name, region=None, is_dark_mode=False):
         """截取指定区域的屏幕截图，用于制作模板"""
@@ -189,21 +339,20 @@ class WeChatAuto(QObject):
             full_template_path = os.path.join(self.template_path, mode_dir)
             os.makedirs(full_template_path, exist_ok=True)  # 确保目录存在
 
+            screen_width, screen_height = self.capture_backend.screen_size()
             if region:
                 # 确保区域有效
-                screen_width, screen_height = pyautogui.size()
                 if (region[0] + region[2] > screen_width or 
                     region[1] + region[3] > screen_height):
                     self._update_status("警告：截图区域超出屏幕范围，将截取全屏")
-                    screenshot = pyautogui.screenshot()
-                else:
-                    screenshot = pyautogui.screenshot(region=region)
-            else:
-                screenshot = pyautogui.screenshot()
+                    region = None
+            if region is None:
+                region = (0, 0, screen_width, screen_height)
+            rgb, _ = self.capture_backend.capture(region)
                 
             # 修正保存路径：存入对应模式的子目录（light/dark）
             filename = os.path.join(full_template_path, f"{region_name}.png")
-            screenshot.save(filename)
+            Image.fromarray(rgb).save(filename)
             self._update_status(f"已保存截图: {filename}")
             return filename
         except Exception as e:
@@ -217,124 +366,69 @@ class WeChatAuto(QObject):
         
         if not self.opencv_available:
             return self.locate_element(template_name, confidence, retry_times)
-            
-        modes = ["light", "dark"]
-        template_files = [
-            os.path.join(self.template_path, mode, f"{template_name}.png") 
-            for mode in modes
-        ]
         
-        valid_templates = [f for f in template_files if os.path.exists(f)]
-        if not valid_templates:
-            self._update_status(f"模板文件不存在: {template_files}")
-            return None
+        # 本轮定位只截屏一次，所有模板和匹配器共享
+        frame = self.frame_grabber.grab()
         
-        for template_file in valid_templates:
-            # 尝试多尺度匹配
-            result = self.multi_scale_template_match(template_file, confidence)
-            if result:
-                mode_used = "深色" if "dark" in template_file else "浅色"
-                self._update_status(f"✓ 多尺度匹配成功定位 {template_name}（{mode_used}模式）")
-                return result
-            
-            # 尝试特征匹配
-            result = self.feature_based_match(template_file)
-            if result:
-                mode_used = "深色" if "dark" in template_file else "浅色"
-                self._update_status(f"✓ 特征匹配成功定位 {template_name}（{mode_used}模式）")
-                return result
+        if not self.window_coordinates:
+            self.get_wechat_window_info()
         
-        return None
+        return self.image_locator.locate(template_name, confidence, frame)
     
-    def multi_scale_template_match(self, template_path, confidence=0.7):
-        """多尺度模板匹配"""
-        try:
-            screenshot = pyautogui.screenshot()
-            screen_np = np.array(screenshot)
-            screen_gray = cv2.cvtColor(screen_np, cv2.COLOR_RGB2GRAY)
-            
-            template = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
-            if template is None:
-                return None
-            
-            scales = [0.7, 0.8, 0.9, 1.0, 1.1, 1.2, 1.3]
-            best_match = None
-            best_confidence = 0
-            
-            for scale in scales:
-                new_w = int(template.shape[1] * scale)
-                new_h = int(template.shape[0] * scale)
-                if new_w < 20 or new_h < 20:
-                    continue
-                    
-                resized_template = cv2.resize(template, (new_w, new_h))
-                result = cv2.matchTemplate(screen_gray, resized_template, cv2.TM_CCOEFF_NORMED)
-                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-                
-                if max_val > best_confidence and max_val > confidence:
-                    best_confidence = max_val
-                    x, y = max_loc
-                    best_match = type('Obj', (), {
-                        'left': x, 'top': y, 'width': new_w, 'height': new_h,
-                        'confidence': max_val
-                    })()
-            
-            return best_match
-        except Exception as e:
-            self._update_status(f"多尺度匹配失败: {e}")
+    def uia_locate(self, template_name):
+        """通过 UIA 控件树定位元素，未启用、会话无效或找不到时返回 None"""
+        if not self.config["use_uia_locator"] or not self.session.is_valid():
             return None
-    
-    def feature_based_match(self, template_path):
-        """基于特征的图像匹配"""
         try:
-            screenshot = pyautogui.screenshot()
-            screen_np = np.array(screenshot)
-            screen_gray = cv2.cvtColor(screen_np, cv2.COLOR_RGB2GRAY)
-            
-            template = cv2.imread(template_path, cv2.IMREAD_GRAYSCALE)
-            if template is None:
-                return None
-            
-            # 使用ORB特征检测器
-            orb = cv2.ORB_create()
-            kp1, des1 = orb.detectAndCompute(screen_gray, None)
-            kp2, des2 = orb.detectAndCompute(template, None)
-            
-            if des1 is None or des2 is None:
-                return None
-            
-            # 特征匹配
-            bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
-            matches = bf.match(des1, des2)
-            matches = sorted(matches, key=lambda x: x.distance)
-            
-            if len(matches) >= 10:
-                good_matches = matches[:10]
-                avg_distance = sum(m.distance for m in good_matches) / len(good_matches)
-                
-                if avg_distance < 50:  # 距离越小匹配越好
-                    src_pts = np.float32([kp1[m.queryIdx].pt for m in good_matches])
-                    dst_pts = np.float32([kp2[m.trainIdx].pt for m in good_matches])
-                    
-                    M, mask = cv2.findHomography(dst_pts, src_pts, cv2.RANSAC, 5.0)
-                    if M is not None:
-                        h, w = template.shape
-                        pts = np.float32([[0,0], [0,h-1], [w-1,h-1], [w-1,0]]).reshape(-1,1,2)
-                        dst = cv2.perspectiveTransform(pts, M)
-                        
-                        x, y, w, h = cv2.boundingRect(dst)
-                        return type('Obj', (), {'left': x, 'top': y, 'width': w, 'height': h})()
-            
-            return None
+            rect = self.uia_locator.locate(template_name, self.session.window)
         except Exception as e:
-            self._update_status(f"特征匹配失败: {e}")
+            self._update_status(f"UIA定位 {template_name} 出错: {e}")
             return None
+        if rect is None:
+            return None
+        left, top, width, height = rect
+        self._update_status(f"✓ UIA控件定位 {template_name}")
+        return type('Obj', (), {'left': left, 'top': top, 'width': width, 'height': height})()
     
-    def locate_element(self, template_name, confidence=None, retry_times=None, grayscale=True):
-        """使用图像识别定位元素，增加兼容性处理，同时尝试浅色和深色模式模板"""
+    def locate_many(self, template_names, confidence=None):
+        """一次截屏批量定位多个元素，返回 {元素名: 匹配结果或None}（UIA 优先，图像识别后备）"""
+        confidence = confidence or self.config["confidence"]
+        
+        results = {name: self.uia_locate(name) for name in template_names}
+        remaining = [name for name in template_names if results[name] is None]
+        if not remaining:
+            return results
+        
+        if not self.opencv_available:
+            results.update({name: self.locate_element(name, confidence, use_uia=False) for name in remaining})
+            return results
+        
+        # 所有元素共享同一帧和同一份窗口信息
+        frame = self.frame_grabber.grab()
+        if not self.window_coordinates:
+            self.get_wechat_window_info()
+        
+        results.update({name: self.image_locator.locate(name, confidence, frame) for name in remaining})
+        return results
+    
+    def _locate_on_screen(self, template_file, region, **kwargs):
+        """与 pyautogui.locateOnScreen 相同，但截图来自当前截屏后端"""
+        rgb, (left, top) = self.capture_backend.capture(region)
+        box = pyautogui.locate(template_file, Image.fromarray(rgb), **kwargs)
+        if box:
+            return box._replace(left=box.left + left, top=box.top + top)
+        return None
+    
+    def locate_element(self, template_name, confidence=None, retry_times=None, grayscale=True, use_uia=True):
+        """定位元素：UIA 控件树优先，其次图像识别（同时尝试浅色和深色模式模板）"""
         confidence = confidence or self.config["confidence"]
         retry_times = retry_times or self.config["retry_times"]
         
+        if use_uia:
+            result = self.uia_locate(template_name)
+            if result:
+                return result
+        
         # 如果启用混合模式，使用高级识别
         if self.use_hybrid_mode and self.opencv_available:
             result = self.advanced_locate_element(template_name, confidence, retry_times)
@@ -352,6 +446,9 @@ class WeChatAuto(QObject):
         if not valid_templates:
             self._update_status(f"模板文件不存在: {template_files}")
             return None
+        # 主题已知时只用对应主题的模板
+        valid_templates = self.image_locator.templates_for_theme(valid_templates,
+                                                                 self.image_locator.theme_detector.theme)
         
         kwargs = {"grayscale": grayscale}
         if self.opencv_available:
@@ -360,73 +457,125 @@ class WeChatAuto(QObject):
         for i in range(retry_times):
             try:
                 element_location = None
-                for template_file in valid_templates:
-                    element_location = pyautogui.locateOnScreen(template_file, **kwargs)
-                    if element_location:
-                        mode_used = "深色" if "dark" in template_file else "浅色"
-                        self._update_status(f"✓ 基础识别成功定位 {template_name}（{mode_used}模式）")
-                        return element_location
-                
-                # 如果全屏没找到，尝试只在微信窗口内搜索
-                wechat_windows = gw.getWindowsWithTitle('微信')
-                if wechat_windows:
-                    wechat_win = wechat_windows[0]
-                    region = (wechat_win.left, wechat_win.top, wechat_win.width, wechat_win.height)
+                # 先只在微信窗口内搜索
+                if self.get_wechat_window_info():
+                    region = self._window_region()
                     for template_file in valid_templates:
-                        element_location = pyautogui.locateOnScreen(template_file, region=region,** kwargs)
+                        element_location = self._locate_on_screen(template_file, region, **kwargs)
                         if element_location:
                             mode_used = "深色" if "dark" in template_file else "浅色"
                             self._update_status(f"✓ 窗口内定位 {template_name}（{mode_used}模式）")
                             return element_location
+                
+                # 窗口内没找到，最后尝试全屏搜索
+                screen_width, screen_height = self.capture_backend.screen_size()
+                for template_file in valid_templates:
+                    element_location = self._locate_on_screen(template_file, (0, 0, screen_width, screen_height), **kwargs)
+                    if element_location:
+                        mode_used = "深色" if "dark" in template_file else "浅色"
+                        self._update_status(f"✓ 基础识别成功定位 {template_name}（{mode_used}模式）")
+                        return element_location
             
                 self._update_status(f"第 {i+1} 次尝试定位 {template_name} 失败")
-                time.sleep(1)
             except Exception as e:
                 self._update_status(f"定位 {template_name} 时出错: {e}")
+            # 最后一次失败后不再等待，直接交给其它定位方式
+            if i + 1 < retry_times:
                 time.sleep(1)
                 
         self._update_status(f"✗ 无法定位 {template_name}，将尝试坐标定位")
         return None
     
+    def click_element(self, element, template_name, method="图像识别"):
+        """点击已定位元素的中心"""
+        click_x = element.left + element.width // 2
+        click_y = element.top + element.height // 2
+        self.input.click(click_x, click_y)
+        self.frame_grabber.invalidate()
+        self.wait_ui_settled(0.5, f"点击{template_name}后界面稳定")
+        self._update_status(f"✓ {method}点击成功: {template_name}")
+        return True
+    
+    def _click_strategies(self, template_name, element_type, confidence, retry_times):
+        """返回元素可用的点击策略 (可确认的策略, 盲点后备策略)，均为 {策略名: 无参函数}，按默认顺序排列
+
+        可确认的策略（UIA、图像识别找到元素，快捷键按下后界面发生变化）参与按历史期望耗时排序；
+        坐标点击无法确认是否点中，不参与排序，总是最后尝试。
+        """
+        strategies = {}
+        fallbacks = {}
+        
+        # 方法1: UIA 控件定位点击
+        def click_by_uia():
+            element = self.uia_locate(template_name)
+            return bool(element) and self.click_element(element, template_name, "UIA控件")
+        strategies["uia"] = click_by_uia
+        
+        # 方法2: 快捷键，按下后等待界面变化确认生效
+        hotkeys = {
+            "search_icon": (('ctrl', 'f'), "快捷键 Ctrl+F 打开搜索", "搜索框打开"),
+            "send_button": (('enter',), "回车键发送", "消息发出"),
+        }
+        if element_type in hotkeys:
+            keys, description, expected = hotkeys[element_type]
+            
+            def press_hotkey():
+                self._update_status(f"使用{description}")
+                baseline = self.window_signature()
+                self.input.hotkey(*keys)
+                self.frame_grabber.invalidate()
+                return self.wait_ui_changed(baseline, 1, expected)
+            strategies["hotkey"] = press_hotkey
+        
+        # 方法3: 图像识别点击（有快捷键可用时不做多轮重试，失败就交给快捷键）
+        image_retries = 1 if element_type in hotkeys else retry_times
+        
+        def click_by_image():
+            element = self.locate_element(template_name, confidence, image_retries, use_uia=False)
+            return bool(element) and self.click_element(element, template_name)
+        strategies["image"] = click_by_image
+        
+        # 方法4: 坐标定位点击（盲点）
+        relative_positions = {
+            "search_icon": (0.02, 0.05, "搜索图标"),
+        }
+        if element_type in relative_positions:
+            rel_x, rel_y, description = relative_positions[element_type]
+            
+            def click_by_position():
+                if self.click_relative_position(rel_x, rel_y, description):
+                    self._update_status(f"✓ 坐标定位{description}成功")
+                    return True
+                return False
+            fallbacks["relative"] = click_by_position
+        return strategies, fallbacks
+    
     def hybrid_click(self, template_name, element_type, confidence=None, retry_times=None):
-        """混合点击方法：图像识别 + 坐标定位 + 快捷键"""
+        """混合点击方法：UIA控件 / 快捷键 / 图像识别按历史期望耗时决定尝试顺序，都失败时再用坐标定位"""
         confidence = confidence or self.config["confidence"]
         retry_times = retry_times or self.config["retry_times"]
         
         self._update_status(f"尝试混合点击: {template_name} ({element_type})")
         
-        # 方法1: 图像识别点击
-        element = self.locate_element(template_name, confidence, retry_times)
-        if element:
-            click_x = element.left + element.width // 2
-            click_y = element.top + element.height // 2
-            pyautogui.moveTo(click_x, click_y, duration=0.2)
-            pyautogui.click()
-            time.sleep(0.5)
-            self._update_status(f"✓ 图像识别点击成功: {template_name}")
-            return True
-        
-        # 方法2: 坐标定位点击
-        if element_type == "search_icon":
-            if self.click_relative_position(0.02, 0.05, "搜索图标"):
-                self._update_status("✓ 坐标定位搜索图标成功")
-                return True
-        elif element_type == "message_input":
-            if self.click_relative_position(0.15, 0.92, "消息输入框"):
-                self._update_status("✓ 坐标定位输入框成功")
+        strategies, fallbacks = self._click_strategies(template_name, element_type, confidence, retry_times)
+        for name in self.strategy_stats.order(element_type, list(strategies)):
+            start = time.perf_counter()
+            try:
+                ok = strategies[name]()
+            except Exception as e:
+                self._update_status(f"点击策略 {name} 出错: {e}")
+                ok = False
+            self.strategy_stats.record(element_type, name, ok, time.perf_counter() - start)
+            if ok:
                 return True
-        elif element_type == "send_button":
-            # 发送按钮可以用回车替代
-            self._update_status("使用回车键发送")
-            pyautogui.press('enter')
-            return True
         
-        # 方法3: 快捷键
-        if element_type == "search_icon":
-            self._update_status("使用快捷键 Ctrl+F 打开搜索")
-            pyautogui.hotkey('ctrl', 'f')
-            time.sleep(1)
-            return True
+        # 盲点后备：不记入统计，避免“总是成功”的坐标点击排到可确认的策略之前
+        for name, fallback in fallbacks.items():
+            try:
+                if fallback():
+                    return True
+            except Exception as e:
+                self._update_status(f"点击策略 {name} 出错: {e}")
         
         return False
     
@@ -439,29 +588,27 @@ class WeChatAuto(QObject):
                     self._update_status(f"已关闭微信进程（PID: {proc.info['pid']}）")
                 except Exception as e:
                     self._update_status(f"忽略进程关闭错误：{str(e)}")
+        self.session.invalidate()
+        self.window_tracker.invalidate()
         time.sleep(3)
 
     def activate_wechat(self, wait_login_time=None):
         """激活微信窗口 - 优先使用UIA，失败时使用备选方案"""
         wait_login_time = wait_login_time or self.config["auto_login_wait_time"]
-        self._update_status("尝试激活微信窗口...")
         
-        # 方法1: 优先使用UIA激活
+        # 方法1: 优先使用UIA激活（复用已连接的会话，窗口仍在前台时不做任何操作）
         try:
-            # 尝试连接已运行的微信
-            app = Application(backend="uia").connect(title="微信", class_name="Qt51514QWindowIcon")
-            main_window = app.window(title="微信", class_name="Qt51514QWindowIcon")
-            main_window.wait("ready", timeout=10)
-            main_window.set_focus()
-            self._update_status("✓ UIA方式激活微信窗口成功")
-            
-            # 确保窗口前置
-            main_window.restore()  # 确保不是最小化
-            main_window.set_focus()
-            time.sleep(1)
+            state = self.session.ensure()
+            if state == SESSION_READY:
+                return True
+            if state == SESSION_CONNECTED:
+                self._update_status("✓ UIA方式激活微信窗口成功")
+            else:
+                self._update_status("✓ 微信窗口已重新前置")
             
             # 更新窗口坐标信息
-            self.get_wechat_window_info()
+            self._update_window_from_session()
+            self.wait_ui_settled(1, "微信窗口前置")
             return True
             
         except ElementNotFoundError:
@@ -472,19 +619,16 @@ class WeChatAuto(QObject):
         # 方法2: 启动新微信实例
         try:
             self.kill_wechat()
-            app = Application(backend="uia").start(self.wechat_path)
+            self.session.start(self.wechat_path)
             self._update_status(f"请在{wait_login_time}秒内完成微信登录...")
             time.sleep(wait_login_time)
             
             # 尝试连接新启动的微信
             for i in range(3):
                 try:
-                    app = Application(backend="uia").connect(title="微信", class_name="Qt51514QWindowIcon")
-                    main_window = app.window(title="微信", class_name="Qt51514QWindowIcon")
-                    main_window.wait("ready", timeout=15)
-                    main_window.set_focus()
+                    self.session.ensure(timeout=15)
                     self._update_status("✓ 新微信实例启动并激活成功")
-                    self.get_wechat_window_info()
+                    self._update_window_from_session()
                     return True
                 except:
                     time.sleep(2)
@@ -496,36 +640,30 @@ class WeChatAuto(QObject):
         # 方法3: 基础激活方式（备选）
         return self.fallback_activate_wechat()
     
+    def _update_window_from_session(self):
+        """用会话缓存的窗口句柄刷新窗口坐标，句柄无效时窗口跟踪器会重新查找"""
+        self.window_tracker.set_handle(self.session.handle)
+        return self.get_wechat_window_info()
+    
     def fallback_activate_wechat(self):
         """备选激活方案：使用窗口管理和点击"""
         self._update_status("使用备选方案激活微信...")
         
-        # 尝试通过窗口标题查找
-        wechat_windows = gw.getWindowsWithTitle('微信')
-        if wechat_windows:
+        # 尝试通过窗口句柄激活（窗口跟踪器只在句柄失效时按标题查找）
+        if self.get_wechat_window_info():
             try:
-                win = wechat_windows[0]
-                # 激活窗口
-                win.activate()
+                # 激活窗口（最小化时先恢复）
+                self.window_tracker.activate()
                 time.sleep(1)
-                
-                # 如果窗口最小化，先恢复
-                if win.isMinimized:
-                    win.restore()
-                    time.sleep(1)
+                self.get_wechat_window_info()
                 
                 # 点击窗口中央激活
-                center_x = win.left + win.width // 2
-                center_y = win.top + win.height // 2
-                pyautogui.click(center_x, center_y)
+                win = self.window_coordinates
+                center_x = win['left'] + win['width'] // 2
+                center_y = win['top'] + win['height'] // 2
+                self.input.click(center_x, center_y)
                 time.sleep(0.5)
                 
-                self.window_coordinates = {
-                    'left': win.left,
-                    'top': win.top,
-                    'width': win.width,
-                    'height': win.height
-                }
                 self._update_status("✓ 备选方案激活微信成功")
                 return True
             except Exception as e:
@@ -543,6 +681,7 @@ class WeChatAuto(QObject):
     def search_and_open_chat(self, friend_name):
         """搜索并打开指定好友的聊天窗口 - 混合方案"""
         self._update_status(f"搜索好友: {friend_name}")
+        self._chat_elements = None
         
         # 确保窗口已激活
         if not self.get_wechat_window_info():
@@ -553,21 +692,24 @@ class WeChatAuto(QObject):
         if not self.hybrid_click("search_icon", "search_icon"):
             # 方法2: 直接使用快捷键
             self._update_status("尝试直接使用搜索快捷键")
-            pyautogui.hotkey('ctrl', 'f')
-            time.sleep(1)
+            self.input.hotkey('ctrl', 'f')
+            self.wait_ui_settled(1, "搜索框打开")
         
         # 清空并输入搜索内容
-        pyautogui.hotkey('ctrl', 'a')
-        pyautogui.press('backspace')
-        time.sleep(0.3)
+        self.input.hotkey('ctrl', 'a')
+        self.input.press('backspace')
+        self.wait_ui_settled(0.3, "清空搜索框")
+        baseline = self.window_signature()
         
-        pyperclip.copy(friend_name)
-        pyautogui.hotkey('ctrl', 'v')
-        time.sleep(2)  # 等待搜索结果
+        self.input.paste(friend_name)
+        # 等待搜索结果列表出现
+        self.wait_ui_changed(baseline, 2, "搜索结果出现")
         
-        # 选择好友
-        pyautogui.press('enter')
-        time.sleep(1.5)
+        # 选择好友，等待聊天窗口切换完成
+        baseline = self.window_signature()
+        self.input.press('enter')
+        self.frame_grabber.invalidate()
+        self.wait_ui_changed(baseline, 1.5, "聊天窗口打开")
         
         # 验证是否成功打开聊天窗口
         if self.verify_chat_opened():
@@ -576,10 +718,12 @@ class WeChatAuto(QObject):
         else:
             # 备用选择方法
             self._update_status("尝试备用选择方法")
-            pyautogui.press('down')
-            time.sleep(0.5)
-            pyautogui.press('enter')
-            time.sleep(1.5)
+            self.input.press('down')
+            self.wait_ui_settled(0.5, "选中搜索结果")
+            baseline = self.window_signature()
+            self.input.press('enter')
+            self.frame_grabber.invalidate()
+            self.wait_ui_changed(baseline, 1.5, "聊天窗口打开")
             
             return self.verify_chat_opened()
     
@@ -587,7 +731,7 @@ class WeChatAuto(QObject):
         """验证聊天窗口是否成功打开"""
         # 多种验证方式
         checks = [
-            lambda: self.locate_element("message_input", confidence=0.6) is not None,
+            lambda: self._locate_chat_elements().get("message_input") is not None,
             lambda: self.hybrid_click("message_input", "message_input", retry_times=1),
             lambda: self.get_wechat_window_info() and "聊天" in gw.getActiveWindow().title
         ]
@@ -600,54 +744,137 @@ class WeChatAuto(QObject):
                 continue
         return False
     
-    def send_message(self, message):
-        """发送消息 - 混合方案"""
+    def _locate_chat_elements(self):
+        """一次截屏同时定位输入框和发送按钮，结果留给 send_message 复用"""
+        self._chat_elements = self.locate_many(["message_input", "send_button"], confidence=0.6)
+        return self._chat_elements
+    
+    def send_message(self, message, before_send=None):
+        """发送消息 - 混合方案，before_send 在真正触发发送前调用（用于记录发送状态）"""
         self._update_status("准备发送消息")
         
+        # 复用验证聊天窗口时的定位结果，没有则一次截屏批量定位
+        located = self._chat_elements or self.locate_many(["message_input", "send_button"])
+        self._chat_elements = None
+        
         # 激活输入框
-        if not self.hybrid_click("message_input", "message_input"):
-            # 备用方案：直接点击相对位置
-            self.click_relative_position(0.15, 0.92, "消息输入框")
+        if located.get("message_input"):
+            self.click_element(located["message_input"], "message_input")
+        elif not self.hybrid_click("message_input", "message_input"):
+            # 备用方案：直接点击聊天区域下方的输入框位置（左侧是会话列表）
+            self.click_relative_position(0.65, 0.88, "消息输入框")
         
         # 清空并输入消息
-        pyautogui.hotkey('ctrl', 'a')
-        pyautogui.press('backspace')
-        time.sleep(0.2)
+        self.input.hotkey('ctrl', 'a')
+        self.input.press('backspace')
         
-        pyperclip.copy(message)
-        pyautogui.hotkey('ctrl', 'v')
-        time.sleep(0.5)
+        self.input.paste(message)
+        self.wait_ui_settled(0.5, "消息粘贴完成")
+        baseline = self.window_signature()
         
+        if before_send:
+            before_send()
         # 发送消息
-        if not self.hybrid_click("send_button", "send_button"):
-            # 备用发送方案
-            pyautogui.press('enter')
+        if located.get("send_button"):
+            self.click_element(located["send_button"], "send_button")
+        elif not self.hybrid_click("send_button", "send_button"):
+            # 混合点击已经尝试过回车发送，不再重复按回车，避免重复发送
+            self._update_status("未能确认消息已发出")
         
-        time.sleep(1)
+        # 等待消息出现在聊天记录中
+        self.frame_grabber.invalidate()
+        self.wait_ui_changed(baseline, 1, "消息发出")
         self._update_status("✓ 消息发送完成")
         return True
     
-    def send_wechat_message(self, friend_name, message):
-        """主函数：发送微信消息"""
+    @exclusive_send
+    def send_wechat_message(self, friend_name, message, before_send=None):
+        """主函数：发送微信消息，before_send 在真正触发发送前调用"""
         self._update_status(f"开始发送消息给 {friend_name}...")
-        
-        # 激活微信窗口
-        if not self.activate_wechat():
-            self._update_status("无法激活微信窗口")
-            return False
-        
-        # 搜索并打开聊天窗口
-        if not self.search_and_open_chat(friend_name):
-            self._update_status("无法打开聊天窗口")
-            return False
-        
-        # 发送消息
-        if not self.send_message(message):
-            self._update_status("发送消息失败")
-            return False
-        
-        self._update_status(f"✓ 成功发送消息给 {friend_name}")
-        return True
+        self.input.begin_timing()
+        try:
+            # 激活微信窗口
+            if not self.activate_wechat():
+                self._update_status("无法激活微信窗口")
+                return False
+            
+            # 搜索并打开聊天窗口
+            if not self.search_and_open_chat(friend_name):
+                self._update_status("无法打开聊天窗口")
+                return False
+            
+            # 发送消息
+            if not self.send_message(message, before_send=before_send):
+                self._update_status("发送消息失败")
+                return False
+            
+            self._update_status(f"✓ 成功发送消息给 {friend_name}")
+            return True
+        finally:
+            self._finish_send_timing()
+    
+    @exclusive_send
+    def send_queued_jobs(self, jobs, before_send=None):
+        """发送同一好友的一组定时任务（供任务调度线程调用）：只搜索并打开一次聊天，然后依次发送每条消息
+
+        第一条消息前的免打扰时段和发送间隔由调度线程在取出任务前等待（不占用发送锁）；之后每条消息按发送节奏等待，
+        进入免打扰时段时停止。before_send(job) 在真正触发发送前调用。
+        返回 {任务编号: 是否成功}；某条消息发送失败、出错或进入免打扰时段后停止，剩下的任务不在结果中（由调度线程放回队列）。
+        出错时也返回已发送部分的结果，已发出的消息不会被当作结果未知。
+        """
+        friend_name = jobs[0]["recipient"]
+        self._update_status(f"开始发送 {len(jobs)} 条消息给 {friend_name}...")
+        results = {}
+        self.input.begin_timing()
+        try:
+            try:
+                opened = self.activate_wechat() and self.search_and_open_chat(friend_name)
+            except Exception as e:
+                self._update_status(f"打开聊天窗口时出错: {str(e)}")
+                opened = False
+            if not opened:
+                self._update_status("无法打开聊天窗口")
+                self.pacer.record(False)
+                return {job["id"]: False for job in jobs}
+            for index, job in enumerate(jobs):
+                if index:
+                    # 聊天窗口保持打开，后续消息直接发送（耗时按条统计）
+                    self._finish_send_timing()
+                    if self.pacer.quiet_delay() > 0:
+                        self._update_status("进入免打扰时段，剩余消息留在队列中稍后发送")
+                        break
+                    self.pacer.throttle(on_status=self._update_status)
+                    self.input.begin_timing()
+                try:
+                    sent = self.send_message(
+                        job["message"],
+                        before_send=(lambda job=job: before_send(job)) if before_send else None
+                    )
+                except Exception as e:
+                    # 调度线程根据 before_send 是否已调用判断这条消息是失败还是结果未知
+                    self._update_status(f"发送第 {index + 1} 条消息时出错: {str(e)}")
+                    sent = False
+                self.pacer.record(sent)
+                results[job["id"]] = sent
+                if not sent:
+                    self._update_status(f"发送第 {index + 1} 条消息失败，剩余消息稍后重新打开聊天发送")
+                    break
+            self._update_status(f"✓ 已发送 {sum(results.values())}/{len(jobs)} 条消息给 {friend_name}")
+            return results
+        finally:
+            self._finish_send_timing()
+            self.strategy_stats.flush()
+    
+    def _finish_send_timing(self):
+        """结束本次发送的耗时统计并输出分解结果"""
+        timing = self.input.end_timing()
+        if not timing:
+            return None
+        self.last_send_timing = timing
+        self._update_status(f"本次耗时 {timing['total']:.2f} 秒：输入 {timing['input']:.2f} 秒"
+                            f"（{timing['actions']} 次操作），等待界面 {timing['wait']:.2f} 秒，"
+                            f"识别等其它 {timing['other']:.2f} 秒")
+        return timing
     
     def create_templates(self):
         """创建模板图片"""
@@ -694,46 +921,122 @@ class WeChatAuto(QObject):
         self._update_status("\n✓ 模板创建完成！")
         self._update_status("提示：现在支持混合定位，即使模板识别失败也会尝试坐标定位")
 
-    def send_batch_messages(self, friend_list, message):
-        """批量发送消息"""
+    def send_batch_messages(self, friends, message, campaign=None, source=None):
+        """批量发送消息，每位好友的状态记入日志
+
+        发送锁只在给每位好友发送时持有，发送间隔和免打扰时段的等待不占用锁，界面发送和定时任务可以在间隙中进行。
+        campaign 为空时新建批次；指定已有批次时为续发，跳过该批次已发送（或结果未知）的好友，消息沿用该批次的内容。
+        friends 可以是列表，也可以是 iter_recipients_file 等逐个产出好友的迭代器（不会整体读入内存）。
+        """
         self._update_status(f"\n=== 开始批量发送消息 ===")
-        total = len(friend_list)
-        if total == 0:
+        total = len(friends) if hasattr(friends, "__len__") else None
+        friends = iter(friends)
+        first = next(friends, None)
+        if first is None:
             self.status_updated.emit("好友列表为空，无法发送消息")
             return False
-        self._update_status(f"目标好友数量: {len(friend_list)}")
+        friends = itertools.chain([first], friends)
+        if total is not None:
+            self._update_status(f"目标好友数量: {total}")
         
-        if not self.activate_wechat():
-            self._update_status("批量发送失败：无法激活微信窗口")
-            return False
+        if campaign:
+            info = self.journal.campaign_info(campaign)
+            if info is None:
+                self._update_status(f"批量发送失败：找不到批次 {campaign}")
+                return False
+            if info["message"] != message:
+                self._update_status("续发批次时消息内容沿用该批次原来的消息")
+                message = info["message"]
+            self._update_status(f"续发批次 {campaign}")
+        else:
+            campaign = self.journal.new_campaign(message, source)
+            self._update_status(f"新建批次 {campaign}")
+        uncertain = self.journal.friends_in_state(campaign, STATE_SENDING)
+        if uncertain:
+            self._update_status(f"以下好友上次发送中断、结果未知，不会自动重发，请人工确认: {uncertain}")
+        
+        with self.send_lock:
+            if not self.activate_wechat():
+                self._update_status("批量发送失败：无法激活微信窗口")
+                return False
             
         success_count = 0
+        skipped_count = 0
         fail_list = []
+        processed = 0
+        self.pacer.reset()
         
-        for index, friend_name in enumerate(friend_list, 1):
-            self._update_status(f"\n--- 正在处理第 {index}/{len(friend_list)} 位好友：{friend_name} ---")
+        for position, friend_name in enumerate(friends):
+            # 边读边登记，已发送（或结果未知）的好友直接跳过
+            self.journal.enqueue(campaign, [friend_name], start=position)
+            state = self.journal.state(campaign, friend_name)
+            if state in DONE_STATES:
+                skipped_count += 1
+                reason = "已发送" if state == STATE_SENT else "上次发送结果未知"
+                self._update_status(f"跳过 {friend_name}：本批次{reason}")
+                continue
+            processed += 1
+            progress = f"{position + 1}/{total}" if total is not None else f"{position + 1}"
+            self._update_status(f"\n--- 正在处理第 {progress} 位好友：{friend_name} ---")
             
-            try:
-                if self.search_and_open_chat(friend_name) and self.send_message(message):
-                    success_count += 1
-                    self._update_status(f"✅ 已发送给 {friend_name}")
-                else:
-                    fail_list.append(friend_name)
-                    self._update_status(f"❌ 发送给 {friend_name} 失败")
-                
-                # 休息避免频繁操作
-                if index % 3 == 0:
-                    self._update_status("休息3秒...")
-                    time.sleep(3)
+            # 按发送节奏等待（免打扰时段内一直等到时段结束），等待时不占用发送锁
+            self.pacer.wait(on_status=self._update_status)
+            with self.send_lock:
+                try:
+                    # 发送前检查窗口仍然有效且在前台（会话有效时几乎没有开销）
+                    if not self.activate_wechat():
+                        fail_list.append(friend_name)
+                        self.journal.mark(campaign, friend_name, STATE_FAILED, "无法激活微信窗口")
+                        self.pacer.record(False)
+                        self._update_status(f"❌ 发送给 {friend_name} 失败：无法激活微信窗口")
+                        continue
+                    self.journal.mark(campaign, friend_name, STATE_SEARCHING)
+                    self.input.begin_timing()
+                    try:
+                        sent = self.search_and_open_chat(friend_name) and self.send_message(
+                            message,
+                            before_send=lambda: self.journal.mark(campaign, friend_name, STATE_SENDING)
+                        )
+                    finally:
+                        self._finish_send_timing()
+                    if sent:
+                        success_count += 1
+                        self.journal.mark(campaign, friend_name, STATE_SENT)
+                        self._update_status(f"✅ 已发送给 {friend_name}")
+                    else:
+                        fail_list.append(friend_name)
+                        self.journal.mark(campaign, friend_name, STATE_FAILED)
+                        self._update_status(f"❌ 发送给 {friend_name} 失败")
+                    self.pacer.record(sent)
+                    self._update_status(f"当前速度: {self.pacer.throughput():.1f} 条/分钟"
+                                        + (f"（失败较多，已降速 {self.pacer.slowdown:.1f} 倍）"
+                                           if self.pacer.slowdown > 1 else ""))
                     
-            except Exception as e:
-                fail_list.append(friend_name)
-                self._update_status(f"❌ 处理 {friend_name} 时出错: {str(e)}")
-                # 出错后重新激活微信窗口
-                self.activate_wechat()
+                except Exception as e:
+                    fail_list.append(friend_name)
+                    if self.journal.state(campaign, friend_name) == STATE_SENDING:
+                        # 已触发发送，消息可能已经发出：保留“发送中”状态，续发时不会重发
+                        self.journal.mark(campaign, friend_name, STATE_SENDING, str(e))
+                        self._update_status(f"❌ 发送给 {friend_name} 时出错，结果未知: {str(e)}")
+                    else:
+                        self.journal.mark(campaign, friend_name, STATE_FAILED, str(e))
+                        self._update_status(f"❌ 处理 {friend_name} 时出错: {str(e)}")
+                    self.pacer.record(False)
+                    # 出错后重新激活微信窗口
+                    self.activate_wechat()
         
+        self.journal.finish(campaign)
+        self.strategy_stats.flush()
         self._update_status(f"\n=== 批量发送完成 ===")
-        self._update_status(f"成功: {success_count}/{len(friend_list)}")
+        if skipped_count:
+            self._update_status(f"续发批次 {campaign}：跳过已处理的 {skipped_count} 位好友")
+        if processed == 0:
+            self._update_status("本批次所有好友都已处理")
+            return True
+        self._update_status(f"成功: {success_count}/{processed}")
+        summary = self.journal.summary(campaign)
+        self._update_status(f"批次 {campaign} 累计: 已发送 {summary.get(STATE_SENT, 0)}，"
+                            f"失败 {summary.get(STATE_FAILED, 0)}，结果未知 {summary.get(STATE_SENDING, 0)}")
         
         if fail_list:
             self._update_status(f"失败列表: {fail_list}")
@@ -758,9 +1061,9 @@ class FileManager:
             return []
         
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                friends = [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
-            print(f"读取到 {len(friends)} 个好友")
+            stats = IngestStats()
+            friends = list(iter_recipients_file(file_path, stats=stats))
+            print(f"读取到 {len(friends)} 个好友（{stats}）")
             return friends
         except Exception as e:
             print(f"读取好友名单失败: {e}")
@@ -850,6 +1153,7 @@ def main():
         else:
             success = wechat.send_batch_messages(friend_list, message)
         
+        wechat.strategy_stats.flush()
         if success:
             print("🎉 发送完成！")
         else:
@@ -0,0 +1,112 @@
+import threading
+
+WINDOW_TITLE = "微信"
+WINDOW_CLASS = "Qt51514QWindowIcon"
+
+# ensure() 的返回值
+SESSION_READY = "ready"          # 窗口有效且已在前台，什么都不用做
+SESSION_FOCUSED = "focused"      # 窗口有效，已重新前置
+SESSION_CONNECTED = "connected"  # 窗口失效或首次使用，已重新连接
+
+
+class PywinautoDriver:
+    """pywinauto UIA 驱动：连接较慢，存活和前台检查直接用窗口句柄调用 Win32 API"""
+    def __init__(self, title=WINDOW_TITLE, class_name=WINDOW_CLASS):
+        import ctypes
+        from pywinauto import Application
+        self._application = Application
+        self._user32 = ctypes.windll.user32
+        self.title = title
+        self.class_name = class_name
+
+    def connect(self, timeout):
+        """连接运行中的微信，返回主窗口控件（找不到时抛出 ElementNotFoundError）"""
+        app = self._application(backend="uia").connect(title=self.title, class_name=self.class_name)
+        main_window = app.window(title=self.title, class_name=self.class_name)
+        main_window.wait("ready", timeout=timeout)
+        return main_window.wrapper_object()
+
+    def start(self, path):
+        """启动新的微信实例"""
+        self._application(backend="uia").start(path)
+
+    def handle(self, window):
+        return window.handle
+
+    def process_id(self, window):
+        return window.process_id()
+
+    def is_alive(self, window):
+        return bool(window.handle) and bool(self._user32.IsWindow(window.handle))
+
+    def is_foreground(self, window):
+        return (self._user32.GetForegroundWindow() == window.handle and
+                not self._user32.IsIconic(window.handle))
+
+    def focus(self, window):
+        if self._user32.IsIconic(window.handle):
+            window.restore()  # 确保不是最小化
+        window.set_focus()
+
+
+class WeChatSession:
+    """长期有效的微信 UIA 会话：只连接一次，缓存窗口控件和进程号，句柄失效时才重新连接"""
+    def __init__(self, driver=None, ready_timeout=10):
+        self._driver = driver
+        self.ready_timeout = ready_timeout
+        self.window = None
+        self.pid = None
+        self.handle = None
+        self.connect_count = 0
+        self._lock = threading.RLock()
+
+    @property
+    def driver(self):
+        """驱动在首次使用时创建（pywinauto 只在 Windows 上可用）"""
+        if self._driver is None:
+            self._driver = PywinautoDriver()
+        return self._driver
+
+    def is_valid(self):
+        """缓存的窗口句柄是否仍然有效"""
+        with self._lock:
+            if self.window is None:
+                return False
+            try:
+                return self.driver.is_alive(self.window)
+            except Exception:
+                return False
+
+    def ensure(self, timeout=None):
+        """保证微信窗口可用并在前台，返回 SESSION_READY / SESSION_FOCUSED / SESSION_CONNECTED
+
+        连接失败时抛出驱动的异常（如 ElementNotFoundError）。
+        """
+        with self._lock:
+            if self.is_valid():
+                if self.driver.is_foreground(self.window):
+                    return SESSION_READY
+                self.driver.focus(self.window)
+                return SESSION_FOCUSED
+
+            self.invalidate()
+            window = self.driver.connect(timeout or self.ready_timeout)
+            self.connect_count += 1
+            self.window = window
+            self.handle = self.driver.handle(window)
+            self.pid = self.driver.process_id(window)
+            self.driver.focus(window)
+            return SESSION_CONNECTED
+
+    def start(self, path):
+        """启动新的微信实例，旧会话作废"""
+        with self._lock:
+            self.invalidate()
+            self.driver.start(path)
+
+    def invalidate(self):
+        """丢弃缓存的窗口（微信被关闭或重启时调用）"""
+        with self._lock:
+            self.window = None
+            self.pid = None
+            self.handle = None
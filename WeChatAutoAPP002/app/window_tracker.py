@@ -0,0 +1,158 @@
+import threading
+
+WINDOW_TITLE = "微信"
+
+
+class Win32WindowApi:
+    """按窗口句柄读取几何信息的 Win32 接口，只有查找窗口时才枚举顶层窗口"""
+    SW_RESTORE = 9
+    MONITOR_DEFAULTTONEAREST = 2
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        self._wintypes = wintypes
+        self._user32 = ctypes.windll.user32
+
+        # 显式声明参数类型，避免 64 位句柄被截断
+        self._user32.FindWindowW.argtypes = [wintypes.LPCWSTR, wintypes.LPCWSTR]
+        self._user32.FindWindowW.restype = wintypes.HWND
+        self._user32.IsWindow.argtypes = [wintypes.HWND]
+        self._user32.IsWindow.restype = wintypes.BOOL
+        self._user32.GetWindowRect.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.RECT)]
+        self._user32.GetWindowRect.restype = wintypes.BOOL
+        self._user32.IsIconic.argtypes = [wintypes.HWND]
+        self._user32.IsIconic.restype = wintypes.BOOL
+        self._user32.MonitorFromWindow.argtypes = [wintypes.HWND, wintypes.DWORD]
+        self._user32.MonitorFromWindow.restype = wintypes.HMONITOR
+        self._user32.ShowWindow.argtypes = [wintypes.HWND, ctypes.c_int]
+        self._user32.ShowWindow.restype = wintypes.BOOL
+        self._user32.SetForegroundWindow.argtypes = [wintypes.HWND]
+        self._user32.SetForegroundWindow.restype = wintypes.BOOL
+
+    def find(self, title):
+        """按标题查找窗口句柄：先精确匹配，再退回 pygetwindow 的模糊匹配"""
+        handle = self._user32.FindWindowW(None, title)
+        if handle:
+            return handle
+        import pygetwindow as gw
+        windows = gw.getWindowsWithTitle(title)
+        return windows[0]._hWnd if windows else None
+
+    def is_valid(self, handle):
+        return bool(handle) and bool(self._user32.IsWindow(handle))
+
+    def rect(self, handle):
+        """窗口位置 (left, top, width, height)"""
+        rect = self._wintypes.RECT()
+        if not self._user32.GetWindowRect(handle, self._ctypes.byref(rect)):
+            return None
+        return rect.left, rect.top, rect.right - rect.left, rect.bottom - rect.top
+
+    def is_minimized(self, handle):
+        return bool(self._user32.IsIconic(handle))
+
+    def monitor(self, handle):
+        return self._user32.MonitorFromWindow(handle, self.MONITOR_DEFAULTTONEAREST)
+
+    def activate(self, handle):
+        """恢复（如果最小化）并前置窗口"""
+        if self.is_minimized(handle):
+            self._user32.ShowWindow(handle, self.SW_RESTORE)
+        return bool(self._user32.SetForegroundWindow(handle))
+
+
+class WindowTracker:
+    """微信窗口几何跟踪：句柄只查找一次，之后按句柄刷新位置、所在显示器和最小化状态
+
+    窗口位置或大小变化时通知监听者 callback(旧几何, 新几何)，供区域规划、位置备忘等缓存更新。
+    """
+    def __init__(self, api=None, title=WINDOW_TITLE):
+        self._api = api
+        self.title = title
+        self.handle = None
+        self.geometry = None
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    @property
+    def api(self):
+        """接口在首次使用时创建（Win32 接口只在 Windows 上可用）"""
+        if self._api is None:
+            self._api = Win32WindowApi()
+        return self._api
+
+    def add_listener(self, callback):
+        """注册窗口几何变化的回调"""
+        self._listeners.append(callback)
+
+    def set_handle(self, handle):
+        """直接使用已知的窗口句柄（如 UIA 会话中的句柄），省去查找"""
+        with self._lock:
+            if handle and handle != self.handle:
+                self.handle = handle
+
+    def _resolve(self):
+        if self.handle is not None and self.api.is_valid(self.handle):
+            return self.handle
+        self.handle = self.api.find(self.title)
+        return self.handle
+
+    def refresh(self):
+        """按句柄刷新窗口几何，返回几何 dict；窗口不存在时返回 None"""
+        with self._lock:
+            handle = self._resolve()
+            if handle is None:
+                self.geometry = None
+                return None
+            minimized = self.api.is_minimized(handle)
+            old = self.geometry
+            if minimized and old:
+                # 最小化时 Win32 返回的坐标是 (-32000, -32000)，保留上次的位置
+                geometry = dict(old, minimized=True)
+            else:
+                rect = self.api.rect(handle)
+                if rect is None:
+                    self.handle = None
+                    self.geometry = None
+                    return None
+                left, top, width, height = rect
+                geometry = {
+                    'left': left,
+                    'top': top,
+                    'width': width,
+                    'height': height,
+                    'right': left + width,
+                    'bottom': top + height,
+                    'minimized': minimized,
+                    'monitor': self.api.monitor(handle),
+                }
+            self.geometry = geometry
+            listeners = list(self._listeners)
+
+        if old is not None and not minimized and _rect_of(old) != _rect_of(geometry):
+            for callback in listeners:
+                try:
+                    callback(old, geometry)
+                except Exception as e:
+                    print(f"窗口位置变化通知失败: {e}")
+        return dict(geometry)
+
+    def activate(self):
+        """前置窗口，窗口不存在时返回 False"""
+        with self._lock:
+            handle = self._resolve()
+            if handle is None:
+                return False
+            return self.api.activate(handle)
+
+    def invalidate(self):
+        """丢弃缓存的句柄和几何（微信被关闭或重启时调用）"""
+        with self._lock:
+            self.handle = None
+            self.geometry = None
+
+
+def _rect_of(geometry):
+    return geometry['left'], geometry['top'], geometry['width'], geometry['height']